@@ -0,0 +1,180 @@
+"""
+Generators of synthetic data for the benchmarks, deterministic for
+a given size (and seed), scaling to millions of rows.
+"""
+
+import datetime
+import decimal
+import random
+import types
+
+ofx_header = (
+    b'OFXHEADER:100\r\nDATA:OFXSGML\r\nVERSION:102\r\nSECURITY:NONE\r\n'
+    b'ENCODING:USASCII\r\nCHARSET:1252\r\nCOMPRESSION:NONE\r\n'
+    b'OLDFILEUID:NONE\r\nNEWFILEUID:NONE\r\n\r\n'
+)
+
+ofx_signon = (
+    b'<SIGNONMSGSRSV1><SONRS><STATUS><CODE>0<SEVERITY>INFO</STATUS>'
+    b'<DTSERVER>20261017<LANGUAGE>ENG</SONRS></SIGNONMSGSRSV1>'
+)
+
+
+def bank(count):
+    """
+    Chunks of a credit card statement with count transactions.
+    """
+    yield ofx_header + b'<OFX>' + ofx_signon
+    yield (
+        b'<CREDITCARDMSGSRSV1><CCSTMTTRNRS><TRNUID>1'
+        b'<STATUS><CODE>0<SEVERITY>INFO</STATUS><CCSTMTRS><CURDEF>USD'
+        b'<CCACCTFROM><ACCTID>1234</CCACCTFROM>'
+        b'<BANKTRANLIST><DTSTART>20200101<DTEND>20261017\r\n'
+    )
+    for n in range(count):
+        yield (
+            b'<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20261002<TRNAMT>-%d.%02d'
+            b'<FITID>%d<NAME>Payee %d<MEMO>Purchase</STMTTRN>\r\n'
+            % (n % 500, n % 100, n, n % 97)
+        )
+    yield (
+        b'</BANKTRANLIST><LEDGERBAL><BALAMT>-5.00<DTASOF>20261017</LEDGERBAL>'
+        b'</CCSTMTRS></CCSTMTTRNRS></CREDITCARDMSGSRSV1></OFX>'
+    )
+
+
+def investment(count):
+    """
+    Chunks of an investment statement with count transactions,
+    a position and a security.
+    """
+    yield ofx_header + b'<OFX>' + ofx_signon
+    yield (
+        b'<INVSTMTMSGSRSV1><INVSTMTTRNRS><TRNUID>1'
+        b'<STATUS><CODE>0<SEVERITY>INFO</STATUS><INVSTMTRS>'
+        b'<DTASOF>20261017<CURDEF>USD'
+        b'<INVACCTFROM><BROKERID>example.com<ACCTID>1234</INVACCTFROM>'
+        b'<INVTRANLIST><DTSTART>20200101<DTEND>20261017\r\n'
+    )
+    for n in range(count):
+        yield (
+            b'<BUYMF><INVBUY><INVTRAN><FITID>%d<DTTRADE>20261002'
+            b'<MEMO>Contribution</INVTRAN><SECID><UNIQUEID>123456789'
+            b'<UNIQUEIDTYPE>CUSIP</SECID><UNITS>1.5<UNITPRICE>%d.25'
+            b'<TOTAL>-%d.00<SUBACCTSEC>CASH<SUBACCTFUND>CASH</INVBUY>'
+            b'<BUYTYPE>BUY</BUYMF>\r\n' % (n, n % 90 + 10, n % 90 + 10)
+        )
+    yield (
+        b'</INVTRANLIST><INVPOSLIST><POSMF><INVPOS><SECID><UNIQUEID>123456789'
+        b'<UNIQUEIDTYPE>CUSIP</SECID><HELDINACCT>CASH<POSTYPE>LONG'
+        b'<UNITS>100<UNITPRICE>10<MKTVAL>1000<DTPRICEASOF>20261017'
+        b'</INVPOS></POSMF></INVPOSLIST></INVSTMTRS></INVSTMTTRNRS>'
+        b'</INVSTMTMSGSRSV1><SECLISTMSGSRSV1><SECLIST><MFINFO><SECINFO>'
+        b'<SECID><UNIQUEID>123456789<UNIQUEIDTYPE>CUSIP</SECID>'
+        b'<SECNAME>Index Fund<TICKER>FUND</SECINFO></MFINFO></SECLIST>'
+        b'</SECLISTMSGSRSV1></OFX>'
+    )
+
+
+def lifo_rows(count, assets=5, seed=0):
+    """
+    Rows (as from the Coinbase CSV) buying and selling the assets,
+    never selling more than is held.
+    """
+    from jaraco.financial.lifo import Lots
+
+    rand = random.Random(seed)
+    # quantities held, in hundredths
+    held = dict.fromkeys((f'COIN{n}' for n in range(assets)), 0)
+    start = datetime.datetime(2020, 1, 1)
+    for n in range(count):
+        asset = rand.choice(list(held))
+        sell = held[asset] and rand.random() < 0.4
+        qty = rand.randint(1, held[asset]) if sell else rand.randint(1, 10_000)
+        held[asset] += -qty if sell else qty
+        yield {
+            Lots.date_field: (start + datetime.timedelta(hours=n)).isoformat(),
+            Lots.type_field: 'Sell' if sell else 'Buy',
+            Lots.asset_field: asset,
+            Lots.qty_field: str(decimal.Decimal(qty) / 100),
+            Lots.amount_field: str(decimal.Decimal(qty) / 10),
+        }
+
+
+def paychex_rows(count, seed=0):
+    """
+    Rows (as from the Paychex CSV) of 401k contributions and sales.
+    """
+    rand = random.Random(seed)
+    tickers = list(paychex_securities())
+    start = datetime.date(2020, 1, 1)
+    for n in range(count):
+        shares = decimal.Decimal(rand.randint(-500, 2_000)) / 100 or 1
+        price = decimal.Decimal(rand.randint(1_000, 20_000)) / 100
+        yield {
+            'Date': (start + datetime.timedelta(days=n % 2_000)).strftime('%m/%d/%Y'),
+            'Transaction': 'Contribution' if shares > 0 else 'Fee',
+            'Ticker': rand.choice(tickers),
+            'Shares': str(shares),
+            'Price': str(price),
+            'Amount': str(round(shares * price, 2)),
+        }
+
+
+def paychex_securities(count=20):
+    return {
+        f'FUND{n}': types.SimpleNamespace(uniqueid=f'{n:09d}') for n in range(count)
+    }
+
+
+def ledger_transactions(count, seed=0):
+    """
+    Ledger transactions dated randomly over several years, some of
+    them split.
+    """
+    from jaraco.financial import ledger
+
+    rand = random.Random(seed)
+    descriptors = [f'Category {n}' for n in range(50)]
+    payees = [f'Payee {n}' for n in range(500)]
+    start = datetime.date(2020, 1, 1)
+    for _ in range(count):
+        designations = [
+            ledger.SimpleDesignation(
+                rand.choice(descriptors),
+                decimal.Decimal(rand.randint(-50_000, 50_000)) / 100,
+            )
+            for _ in range(1 if rand.random() < 0.9 else 3)
+        ]
+        yield ledger.Transaction(
+            date=start + datetime.timedelta(days=rand.randrange(2_500)),
+            payee=rand.choice(payees),
+            designation=(
+                designations[0]
+                if len(designations) == 1
+                else ledger.SplitDesignation(designations)
+            ),
+        )
+
+
+def qif(count):
+    """
+    A QIF document of count transactions, dated as Paypal dates them.
+    """
+    lines = ['!Type:Bank']
+    for n in range(count):
+        date = datetime.date(2020, 1, 1) + datetime.timedelta(days=n % 2_000)
+        lines += [date.strftime('D%m/%d/%Y'), f'T-{n % 500}.00', f'PPayee {n}', '^']
+    return '\n'.join(lines) + '\n'
+
+
+def file_tree(root, count, size=4096, seed=0):
+    """
+    Create count files of random content (of size bytes) under root,
+    in directories of up to 100 files.
+    """
+    rand = random.Random(seed)
+    for n in range(count):
+        folder = root / f'dir{n // 100}'
+        folder.makedirs_p()
+        (folder / f'file{n}.bin').write_bytes(rand.randbytes(size))
@@ -0,0 +1,61 @@
+"""
+Compare the time and peak memory of reading the transactions from
+large synthetic OFX statements with ``ofxstream`` and ``ofxparse``.
+
+    python -m benchmarks.parse --sizes 1000,5000,20000
+"""
+
+import io
+import time
+import tracemalloc
+
+import autocommand
+
+from jaraco.financial import ofxstream
+
+from . import data
+
+
+def read_ofxstream(content):
+    return sum(1 for _ in ofxstream.records(ofxstream.read_chunks(io.BytesIO(content))))
+
+
+def read_ofxparse(content):
+    import ofxparse
+
+    doc = ofxparse.OfxParser.parse(io.BytesIO(content))
+    return len(doc.account.statement.transactions)
+
+
+def measure(func, content):
+    """
+    Return the result, wall time and peak traced memory of func(content).
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = func(content)
+        return result, time.perf_counter() - start, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+@autocommand.autocommand(__name__)
+def run(sizes: str = '1000,5000', ofxparse_limit: int = 5000):
+    """
+    Report the time and peak memory of each parser on statements of
+    each of the sizes (comma-separated), running ofxparse only on
+    statements up to ofxparse_limit transactions.
+    """
+    parsers = dict(ofxstream=read_ofxstream, ofxparse=read_ofxparse)
+    for kind in data.bank, data.investment:
+        for size in map(int, sizes.split(',')):
+            content = b''.join(kind(size))
+            for name, func in parsers.items():
+                if name == 'ofxparse' and size > ofxparse_limit:
+                    continue
+                count, elapsed, peak = measure(func, content)
+                print(
+                    f'{kind.__name__:10} {size:>7} {name:10} '
+                    f'{elapsed * 1000:10.1f} ms {peak / 2**20:8.1f} MiB ({count})'
+                )
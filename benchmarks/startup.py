@@ -0,0 +1,75 @@
+"""
+Measure the startup time of the ``ofx`` command and its subcommands,
+each in a fresh interpreter.
+
+    python benchmarks/startup.py --repeat 20
+"""
+
+import json
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+import autocommand
+
+ofx = ['-m', 'jaraco.financial.ofx']
+
+commands = {
+    'import': ['-c', 'import jaraco.financial.ofx'],
+    'ofx --help': [*ofx, '--help'],
+    'list-institutions': [*ofx, 'list-institutions'],
+    'query --help': [*ofx, 'query', '--help'],
+    'download-all --help': [*ofx, 'download-all', '--help'],
+    'update-password --help': [*ofx, 'update-password', '--help'],
+}
+
+
+def measure(args, repeat):
+    """
+    Return the wall times of repeated runs of Python with args.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *args], check=True, capture_output=True)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def slowest_imports(count):
+    """
+    Return the modules (imported by the ofx module) with the greatest
+    cumulative import time in microseconds.
+    """
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', *commands['import']],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    pattern = re.compile(r'import time:\s+\d+ \|\s+(\d+) \| (\s*)(\S+)')
+    matches = map(pattern.match, proc.stderr.splitlines())
+    # only consider the top-level imports
+    top = ((int(m.group(1)), m.group(3)) for m in matches if m and len(m.group(2)) <= 2)
+    return sorted(top, reverse=True)[:count]
+
+
+@autocommand.autocommand(__name__)
+def run(repeat: int = 10, imports: int = 10, output: str = None):
+    """
+    Report the median and best startup times for each command, and
+    the slowest imports. Save the results as JSON to output if supplied.
+    """
+    results = {}
+    for name, args in commands.items():
+        times = measure(args, repeat)
+        results[name] = dict(median=statistics.median(times), best=min(times))
+        print(f'{name:24} {results[name]["median"] * 1000:8.1f} ms median')
+    print()
+    for micros, module in slowest_imports(imports):
+        print(f'{module:24} {micros / 1000:8.1f} ms')
+    if output:
+        with open(output, 'w', encoding='utf-8') as stream:
+            json.dump(results, stream, indent=2)
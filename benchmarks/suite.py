@@ -0,0 +1,265 @@
+"""
+Benchmarks of the package's hot paths on synthetic data, saved
+as JSON for comparison across commits.
+
+    python -m benchmarks.suite --output before.json
+    git checkout ...
+    python -m benchmarks.suite --compare before.json
+
+Each benchmark is a function taking the size (the number of rows
+or files) and returning the operation to time. The sizes scale
+with ``--scale``, so ``--scale 100`` runs on millions of rows.
+"""
+
+import contextlib
+import datetime
+import decimal
+import io
+import json
+import platform
+import re
+import statistics
+import subprocess
+import tempfile
+import time
+
+import autocommand
+import path
+from more_itertools import consume
+
+from . import data
+
+benchmarks = {}
+
+
+def benchmark(size):
+    """
+    Register the decorated function as a benchmark of the given
+    (base) size.
+    """
+
+    def register(func):
+        name = func.__name__.replace('__', '.')
+        benchmarks[name] = size, func
+        return func
+
+    return register
+
+
+def _client():
+    from jaraco.financial import ofx
+
+    config = dict(caps=['SIGNON', 'CCSTMT'], fiorg='Bank', url='https://bank')
+    return ofx.OFXClient(config, 'user', 'password')
+
+
+@benchmark(10_000)
+def ofx__query(size):
+    def run():
+        for n in range(size):
+            _client().ccQuery(str(n), '20261001')
+
+    return run
+
+
+@benchmark(10_000)
+def ofx__batch_query(size):
+    accounts = [(str(n), '20261001') for n in range(size)]
+    return lambda: _client().ccBatchQuery(accounts)
+
+
+@benchmark(100_000)
+def ofxstream__validate(size):
+    from jaraco.financial import ofxstream
+
+    content = b''.join(data.bank(size))
+    return lambda: ofxstream.validate([content])
+
+
+@benchmark(100_000)
+def ofxstream__records(size):
+    from jaraco.financial import ofxstream
+
+    content = b''.join(data.bank(size))
+    return lambda: consume(
+        ofxstream.records(ofxstream.read_chunks(io.BytesIO(content)))
+    )
+
+
+@benchmark(50_000)
+def ofxstream__records_investment(size):
+    from jaraco.financial import ofxstream
+
+    content = b''.join(data.investment(size))
+    return lambda: consume(
+        ofxstream.records(ofxstream.read_chunks(io.BytesIO(content)))
+    )
+
+
+@benchmark(50_000)
+def lifo__lots(size):
+    from jaraco.financial.lifo import Lots
+
+    rows = list(data.lifo_rows(size))
+    # Lots consumes the rows, so each run allocates from a copy
+    return lambda: consume(Lots(dict(row) for row in rows))
+
+
+@benchmark(50_000)
+def paychex__to_ofx(size):
+    from jaraco.financial import paychex
+
+    rows = list(data.paychex_rows(size))
+    securities = data.paychex_securities()
+    return lambda: consume(
+        line for row in rows for line in paychex.to_ofx(row, securities)
+    )
+
+
+@benchmark(20_000)
+def ledger__add(size):
+    from jaraco.financial import ledger
+
+    transactions = list(data.ledger_transactions(size))
+
+    def run():
+        book = ledger.Ledger()
+        for txn in transactions:
+            book.add(txn)
+
+    return run
+
+
+@benchmark(100_000)
+def ledger__extend(size):
+    from jaraco.financial import ledger
+
+    transactions = list(data.ledger_transactions(size))
+    return lambda: ledger.Ledger(transactions)
+
+
+def _ledger(size):
+    from jaraco.financial import ledger
+
+    return ledger.Ledger(data.ledger_transactions(size))
+
+
+@benchmark(100_000)
+def ledger__balance_through(size):
+    book = _ledger(size)
+    dates = [
+        datetime.date(2020, 1, 1) + datetime.timedelta(days=n * 25) for n in range(100)
+    ]
+    return lambda: [book.balance_through(date) for date in dates]
+
+
+@benchmark(100_000)
+def ledger__query(size):
+    book = _ledger(size)
+    queries = [(f'Category {n}', None) for n in range(10)]
+    queries += [(None, decimal.Decimal(amount)) for amount in ('-12.34', '100.00')]
+    queries += [(None, None, f'Payee {n}') for n in range(10)]
+    return lambda: [list(book.query(*query)) for query in queries]
+
+
+@benchmark(100_000)
+def columnar__totals(size):
+    from jaraco.financial import columnar
+
+    book = columnar.ColumnarLedger.from_ledger(_ledger(size))
+    return lambda: [book.totals(by) for by in ('descriptor', 'payee', 'month')]
+
+
+@benchmark(200_000)
+def qif__inline_sub(size):
+    from jaraco.financial import qif
+
+    text = data.qif(size)
+    file = path.Path(tempfile.mkdtemp()) / 'paypal.qif'
+
+    # inline_sub rewrites the file, so each run restores it first
+    def run():
+        file.write_text(text)
+        qif.inline_sub(file)
+
+    return run
+
+
+@benchmark(2_000)
+def records__hash_files(size):
+    from jaraco.financial import records
+
+    root = path.Path(tempfile.mkdtemp())
+    data.file_tree(root, size)
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            records.hash_files(root)
+
+    return run
+
+
+def measure(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return dict(median=statistics.median(times), best=min(times))
+
+
+def commit():
+    try:
+        proc = subprocess.run(
+            ['git', 'describe', '--always', '--dirty'],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return proc.stdout.strip()
+
+
+def report(results, baseline=None):
+    for name, result in results.items():
+        line = f'{name:32} {result["size"]:>9} {result["median"] * 1000:10.1f} ms'
+        base = (baseline or {}).get(name)
+        if base and base['size'] == result['size']:
+            line += f' {result["median"] / base["median"]:6.2f}x'
+        print(line)
+
+
+@autocommand.autocommand(__name__)
+def run(
+    select: str = '.',
+    scale: float = 1.0,
+    repeat: int = 5,
+    output: str = None,
+    compare: str = None,
+):
+    """
+    Run the benchmarks with names matching the select pattern and
+    report the median time of each (relative to the results in the
+    compare file, if supplied). Save the results as JSON to output.
+    """
+    baseline = None
+    if compare:
+        with open(compare, encoding='utf-8') as stream:
+            baseline = json.load(stream)['results']
+    results = {}
+    for name, (size, func) in benchmarks.items():
+        if not re.search(select, name):
+            continue
+        size = max(1, int(size * scale))
+        results[name] = dict(size=size, **measure(func(size), repeat))
+        report({name: results[name]}, baseline)
+    if output:
+        doc = dict(
+            commit=commit(),
+            python=platform.python_version(),
+            scale=scale,
+            results=results,
+        )
+        with open(output, 'w', encoding='utf-8') as stream:
+            json.dump(doc, stream, indent=2)
@@ -1,3 +1,4 @@
+import importlib.util
 import sys
 
 collect_ignore = []
@@ -7,3 +8,9 @@ collect_ignore += (
     if sys.version_info < (3,)
     else []
 )
+
+collect_ignore += (
+    ['jaraco/financial/store.py', 'jaraco/financial/columnar.py']
+    if importlib.util.find_spec('numpy') is None
+    else []
+)
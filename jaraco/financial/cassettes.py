@@ -0,0 +1,170 @@
+r"""
+Record and replay of the exchanges with institutions, so that
+downloads can be repeated offline.
+
+Requests are matched on the URL and the request body, less the
+fields that vary from run to run (transaction ids, the client's
+clock, the file id, the start date and the date as of which to report
+positions) and the password, which is never saved.
+
+>>> request = (
+...     b'NEWFILEUID:8f2c\r\n\r\n<OFX><SONRS><DTCLIENT>20261018101010'
+...     b'<USERID>me<USERPASS>secret</SONRS><STMTTRNRQ><TRNUID>8f2d'
+...     b'<CCSTMTRQ><INCTRAN><DTSTART>20260917<INCLUDE>Y</INCTRAN>'
+... )
+>>> print(normalize(request).decode().replace('\r\n', ' '))
+NEWFILEUID:-  <OFX><SONRS><DTCLIENT>-<USERID>me<USERPASS>-</SONRS><STMTTRNRQ><TRNUID>-<CCSTMTRQ><INCTRAN><DTSTART>-<INCLUDE>Y</INCTRAN>
+
+>>> cassette = Cassette(getfixture('tmp_path'), 'record')
+>>> cassette.record('https://bank', request, 200, 'application/x-ofx', b'<TRNUID>8f2d')
+>>> cassette.mode = 'replay'
+>>> cassette.play('https://bank', request.replace(b'8f2d', b'9a9a'))
+(200, 'application/x-ofx', b'<TRNUID>9a9a')
+
+An investment statement request, built afresh at another time,
+replays the recording.
+
+>>> from unittest import mock
+>>> from jaraco.financial import ofx
+>>> def invst_query(now):
+...     client = ofx.OFXClient(dict(fiorg='Broker', url='https://broker'), 'me', 'pw')
+...     with mock.patch.object(ofx, '_date', return_value=now):
+...         return client.invstQuery('broker.com', '1234', '20260917').encode()
+>>> cassette.mode = 'record'
+>>> query = invst_query('20261018101010')
+>>> cassette.record('https://broker', query, 200, 'application/x-ofx', b'<OFX>')
+>>> cassette.mode = 'replay'
+>>> cassette.play('https://broker', invst_query('20261018101011'))
+(200, 'application/x-ofx', b'<OFX>')
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import re
+
+import path
+
+_volatile = re.compile(
+    rb'(NEWFILEUID:|<(?:TRNUID|DTCLIENT|USERPASS|DTSTART|DTASOF)>)[^\r\n<]*'
+)
+
+_trnuid = re.compile(rb'<TRNUID>\s*([^\s<]+)')
+
+
+def normalize(body):
+    """
+    Replace the volatile fields in the request body.
+    """
+    return _volatile.sub(rb'\1-', body)
+
+
+class MissingRecording(LookupError):
+    """
+    No exchange was recorded for the request.
+    """
+
+
+class Cassette:
+    """
+    The exchanges recorded under root, one file per (normalized)
+    request. ``mode`` is 'record' or 'replay'.
+    """
+
+    def __init__(self, root, mode):
+        self.root = path.Path(root)
+        self.mode = mode
+
+    def _file(self, url, body):
+        key = hashlib.sha256(url.encode() + b'\n' + normalize(body)).hexdigest()
+        return self.root / f'{key}.json'
+
+    def record(self, url, body, status, content_type, content):
+        self.root.makedirs_p()
+        doc = dict(
+            url=url,
+            request=normalize(body).decode('latin-1'),
+            trnuids=[id.decode('latin-1') for id in _trnuid.findall(body)],
+            status=status,
+            content_type=content_type,
+            content=content.decode('latin-1'),
+        )
+        self._file(url, body).write_text(json.dumps(doc, indent=2), encoding='utf-8')
+
+    def play(self, url, body):
+        """
+        Return the status, content type and content recorded for the
+        request, with the recorded transaction ids replaced by those
+        in this request.
+        """
+        file = self._file(url, body)
+        if not file.exists():
+            raise MissingRecording(f'No recording for {url} in {self.root}')
+        doc = json.loads(file.read_text(encoding='utf-8'))
+        content = doc['content'].encode('latin-1')
+        trnuids = dict(
+            zip(
+                (id.encode('latin-1') for id in doc['trnuids']),
+                _trnuid.findall(body),
+            )
+        )
+        content = _trnuid.sub(
+            lambda match: b'<TRNUID>' + trnuids.get(match.group(1), match.group(1)),
+            content,
+        )
+        return doc['status'], doc['content_type'], content
+
+
+class Adapter:
+    """
+    A transport adapter (as mounted on a requests Session) recording
+    the exchanges made through adapter or, when replaying, serving
+    them from the cassette.
+    """
+
+    def __init__(self, cassette, adapter):
+        self.cassette = cassette
+        self.adapter = adapter
+        self.stats = adapter.stats
+
+    def send(self, request, **kwargs):
+        body = request.body or b''
+        if self.cassette.mode == 'replay':
+            self.stats.incr('requests')
+            played = self.cassette.play(request.url, body)
+            return self._response(request, *played)
+        resp = self.adapter.send(request, **kwargs)
+        content_type = resp.headers.get('Content-type')
+        self.cassette.record(
+            request.url, body, resp.status_code, content_type, resp.content
+        )
+        return resp
+
+    @staticmethod
+    def _response(request, status, content_type, content):
+        import requests.structures
+
+        resp = requests.Response()
+        resp.status_code = status
+        resp.headers = requests.structures.CaseInsensitiveDict()
+        if content_type:
+            resp.headers['Content-type'] = content_type
+        resp.raw = io.BytesIO(content)
+        resp.url = request.url
+        resp.request = request
+        resp.reason = 'Replayed'
+        return resp
+
+    def close(self):
+        self.adapter.close()
+
+
+def mount(cassette, session):
+    """
+    Mount an adapter recording to (or replaying from) the cassette on
+    each of the session's adapters.
+    """
+    for prefix, inner in list(session.adapters.items()):
+        session.mount(prefix, Adapter(cassette, inner))
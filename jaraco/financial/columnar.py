@@ -0,0 +1,192 @@
+"""
+A columnar copy of a ledger, for reports aggregating whole ledgers.
+
+Each designation of each transaction is a row, so a split
+transaction takes several rows sharing its transaction number. The
+columns are NumPy arrays of integers: dates as ordinals, amounts in
+cents, and text (descriptors, payees, memos and sources) as indexes
+into a pool of values, so that sums by descriptor, payee or month
+are vectorized.
+
+>>> from datetime import date
+>>> from jaraco.financial import ledger
+>>> account = ledger.Account('checking', [
+...     ledger.Transaction(
+...         date=date(2026, 9, 30),
+...         payee='Employer',
+...         designation=ledger.SimpleDesignation('pay', 2000),
+...     ),
+...     ledger.Transaction(
+...         date=date(2026, 10, 2),
+...         payee='Grocer',
+...         designation=ledger.SplitDesignation([
+...             ledger.SimpleDesignation('food', -45),
+...             ledger.SimpleDesignation('home', '-12.50'),
+...         ]),
+...     ),
+... ])
+>>> columns = ColumnarLedger.from_ledger(account)
+>>> len(columns)
+3
+>>> columns.totals('descriptor')
+{'pay': 200000, 'food': -4500, 'home': -1250}
+>>> columns.totals('month')
+{'2026-09': 200000, '2026-10': -5750}
+>>> columns.balance(start=date(2026, 10, 1))
+-5750
+>>> copy = columns.to_ledger()
+>>> copy.name, [txn.amount for txn in copy]
+('checking', [Decimal('2000.00'), Decimal('-57.50')])
+"""
+
+from __future__ import annotations
+
+import datetime
+import decimal
+
+import jaraco.itertools
+
+from . import ledger, store
+
+# typecodes of the columns (as for store.COLUMNS)
+COLUMNS = dict(
+    txn='q', date='i', cents='q', descriptor='i', payee='i', memo='i', source='i'
+)
+
+# the columns that reference the pool of values
+TEXT = 'descriptor', 'payee', 'memo', 'source'
+
+
+class ColumnarLedger:
+    """
+    The columns (txn, date, cents, descriptor, payee, memo, source)
+    of the designations in a ledger, in the ledger's order.
+    """
+
+    def __init__(self, columns, values, name=None):
+        self.columns = columns
+        self.values = store.Pool(values)
+        self.name = name
+
+    def __len__(self):
+        return len(self.columns['txn'])
+
+    @classmethod
+    def from_ledger(cls, transactions):
+        """
+        Load the designations of the transactions in the Ledger (or
+        Account, whose name is kept). Each designation is expected
+        to be a SimpleDesignation (or a SplitDesignation of them).
+        """
+        import numpy
+
+        values = store.Pool()
+        rows = (
+            (
+                number,
+                txn.date.toordinal(),
+                item.cents,
+                values.intern(item.descriptor),
+                values.intern(txn.payee),
+                values.intern(item.memo),
+                values.intern(txn.source),
+            )
+            for number, txn in enumerate(transactions)
+            for item in jaraco.itertools.always_iterable(txn.designation)
+        )
+        columns = list(zip(*rows)) or [()] * len(COLUMNS)
+        return cls(
+            {
+                name: numpy.array(column, dtype=store.NUMPY_TYPES[COLUMNS[name]])
+                for name, column in zip(COLUMNS, columns)
+            },
+            values,
+            getattr(transactions, 'name', None),
+        )
+
+    def to_ledger(self):
+        """
+        Build the transactions back into an Account (if named) or a
+        Ledger. Transactions of one designation get a
+        SimpleDesignation and others a SplitDesignation. Dates are
+        restored as dates (without any time).
+        """
+        import numpy
+
+        txn = self.columns['txn']
+        starts = (numpy.flatnonzero(numpy.diff(txn)) + 1).tolist()
+        bounds = zip([0, *starts], [*starts, len(txn)]) if len(txn) else ()
+        rows = {name: column.tolist() for name, column in self.columns.items()}
+        values = self.values
+
+        def build(start, stop):
+            designations = [
+                ledger.SimpleDesignation(
+                    values[rows['descriptor'][row]],
+                    decimal.Decimal(rows['cents'][row]).scaleb(-2),
+                    values[rows['memo'][row]],
+                )
+                for row in range(start, stop)
+            ]
+            return ledger.Transaction(
+                date=datetime.date.fromordinal(rows['date'][start]),
+                payee=values[rows['payee'][start]],
+                designation=(
+                    designations[0]
+                    if len(designations) == 1
+                    else ledger.SplitDesignation(designations)
+                ),
+                source=values[rows['source'][start]],
+            )
+
+        transactions = (build(start, stop) for start, stop in bounds)
+        if self.name is None:
+            return ledger.Ledger(transactions)
+        return ledger.Account(self.name, transactions)
+
+    def mask(self, start=None, end=None, descriptor=None):
+        """
+        Select the rows for the descriptor (if any) dated from start
+        through end (inclusive, where supplied).
+        """
+        codes = (
+            {}
+            if descriptor is None
+            else dict(descriptor=self.values.codes.get(descriptor, -1))
+        )
+        return store.mask(self.columns, start, end, **codes)
+
+    def balance(self, start=None, end=None, descriptor=None):
+        """
+        Sum of the amounts (in cents) for the descriptor (or all) in
+        the date range.
+        """
+        selected = self.mask(start, end, descriptor)
+        return int(self.columns['cents'][selected].sum())
+
+    def _months(self, selected):
+        """
+        The months of the selected rows, as indexes into the distinct
+        months, and those months (as 'YYYY-MM').
+        """
+        import numpy
+
+        epoch = datetime.date(1970, 1, 1).toordinal()
+        days = (self.columns['date'][selected] - epoch).astype('datetime64[D]')
+        months, keys = numpy.unique(days.astype('datetime64[M]'), return_inverse=True)
+        return keys, [str(month) for month in months]
+
+    def totals(self, by='descriptor', start=None, end=None):
+        """
+        Sum of the amounts (in cents) for each distinct value of a
+        text column (descriptor, payee, memo or source) or for each
+        month, in the date range.
+        """
+        assert by in (*TEXT, 'month')
+        selected = self.mask(start, end)
+        keys, labels = (
+            self._months(selected)
+            if by == 'month'
+            else (self.columns[by][selected], self.values)
+        )
+        return store.sum_by(keys, self.columns['cents'][selected], labels)
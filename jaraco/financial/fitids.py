@@ -0,0 +1,103 @@
+r"""
+A persistent index of the transactions (by FITID) seen for each
+account, for reducing overlapping downloads to the transactions
+not seen before.
+
+>>> index = Index(':memory:')
+>>> index.add('bank 1234', ['1', '2'])
+>>> ('bank 1234', '2') in index, ('bank 1234', '3') in index
+(True, False)
+
+>>> doc = (
+...     b'OFXHEADER:100\r\n\r\n<OFX><BANKTRANLIST>'
+...     b'<STMTTRN><FITID>2<TRNAMT>1</STMTTRN>'
+...     b'<STMTTRN><FITID>3<TRNAMT>2</STMTTRN>'
+...     b'</BANKTRANLIST></OFX>'
+... )
+>>> content, kept = strip_seen(doc, lambda fitid: ('bank 1234', fitid) in index)
+>>> kept
+['3']
+>>> content.count(b'<STMTTRN>')
+1
+"""
+
+from __future__ import annotations
+
+import re
+import sqlite3
+
+from . import ofxstream
+
+# transactions (including INVBANKTRAN, which wraps a STMTTRN) as a whole
+_transactions = {'STMTTRN', 'INVBANKTRAN', *ofxstream.INVESTMENT_TRANSACTIONS}
+_transaction_pattern = re.compile(
+    rb'<(%s)>.*?</\1>' % '|'.join(sorted(_transactions)).encode(), re.DOTALL
+)
+
+_fitid_pattern = re.compile(rb'<FITID>([^<]*)')
+
+
+class Index:
+    """
+    The FITIDs seen for each account, persisted in SQLite and loaded
+    into memory an account at a time, so each check is a set lookup.
+    """
+
+    def __init__(self, filename):
+        # access is serialized, but may come from a worker thread
+        self.db = sqlite3.connect(filename, check_same_thread=False)
+        self.db.execute(
+            'CREATE TABLE IF NOT EXISTS fitids ('
+            'account TEXT NOT NULL, fitid TEXT NOT NULL, '
+            'PRIMARY KEY (account, fitid)) WITHOUT ROWID'
+        )
+        self._seen = {}
+
+    def seen(self, account):
+        """
+        The FITIDs seen for the account.
+        """
+        if account not in self._seen:
+            query = 'SELECT fitid FROM fitids WHERE account = ?'
+            self._seen[account] = {
+                fitid for (fitid,) in self.db.execute(query, (account,))
+            }
+        return self._seen[account]
+
+    def __contains__(self, key):
+        account, fitid = key
+        return fitid in self.seen(account)
+
+    def add(self, account, fitids):
+        fitids = set(fitids) - self.seen(account)
+        with self.db:
+            self.db.executemany(
+                'INSERT OR IGNORE INTO fitids VALUES (?, ?)',
+                ((account, fitid) for fitid in fitids),
+            )
+        self.seen(account).update(fitids)
+
+    def close(self):
+        self.db.close()
+
+
+def strip_seen(content, seen):
+    """
+    Remove from the OFX content the transactions with a FITID
+    satisfying ``seen``. Return the remaining content and the
+    FITIDs of the transactions that remain.
+    """
+    encoding = ofxstream.header_encoding(content[: ofxstream.chunk_size])
+    kept = []
+
+    def strip(match):
+        found = _fitid_pattern.search(match.group(0))
+        if not found:
+            return match.group(0)
+        fitid = found.group(1).strip().decode(encoding, errors='replace')
+        if seen(fitid):
+            return b''
+        kept.append(fitid)
+        return match.group(0)
+
+    return _transaction_pattern.sub(strip, content), kept
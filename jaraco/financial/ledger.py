@@ -1,34 +1,143 @@
 import bisect
+import collections
+import collections.abc
 import datetime
+import decimal
+import functools
+import heapq
+import itertools
+import operator
+import weakref
 
 import jaraco.itertools
 
 
 class Transaction:
-    payee = None
-    date = None
-    designation = None
-    "SimpleDesination, SplitDesignation, or Ledger"
-    source = None
-    "Where was this transaction sourced ('manual', 'bank download')"
-
-    def __init__(self, **kwargs):
-        self.__dict__.update(kwargs)
-        if 'date' not in vars(self):
-            self.date = datetime.datetime.utcnow()
+    """
+    A transaction to a payee on a date, with any other attributes
+    supplied.
+
+    The designation is a SimpleDesignation, SplitDesignation, or
+    Ledger. The source is where the transaction was sourced ('manual',
+    'bank download').
+
+    >>> txn = Transaction(
+    ...     payee='Grocer',
+    ...     designation=SplitDesignation([SimpleDesignation('food', '12.5')]),
+    ...     source='manual',
+    ... )
+    >>> txn.amount
+    Decimal('12.50')
+    >>> txn.designation.append(SimpleDesignation('home', 3))
+    >>> txn.amount, txn.get_amount('home')
+    (Decimal('15.50'), Decimal('3.00'))
+    """
+
+    __slots__ = (
+        '__dict__',
+        '__weakref__',
+        '_designation',
+        '_ledgers',
+        '_payee',
+        '_total',
+        'date',
+        'source',
+    )
+
+    def __init__(self, payee=None, date=None, designation=None, source=None, **kwargs):
+        self._ledgers = ()
+        self._total = None
+        self._payee = payee
+        self.date = datetime.datetime.utcnow() if date is None else date
+        self._designation = designation
+        if isinstance(designation, _Observed):
+            designation._watch(self)
+        self.source = source
+        if kwargs:
+            self.__dict__.update(kwargs)
+
+    def __reduce__(self):
+        fields = dict(
+            vars(self),
+            payee=self.payee,
+            date=self.date,
+            designation=self.designation,
+            source=self.source,
+        )
+        return functools.partial(type(self), **fields), ()
+
+    @property
+    def payee(self):
+        return self._payee
+
+    @payee.setter
+    def payee(self, payee):
+        self._payee = payee
+        self._changed()
+
+    @property
+    def designation(self):
+        return self._designation
+
+    @designation.setter
+    def designation(self, designation):
+        old = getattr(self, '_designation', None)
+        if isinstance(old, _Observed):
+            old._unwatch(self)
+        if isinstance(designation, _Observed):
+            designation._watch(self)
+        self._designation = designation
+        self._changed()
+
+    def _changed(self):
+        """
+        Tell the ledgers holding this transaction that its payee or
+        designation changed.
+        """
+        for ref in self._ledgers:
+            ledger = ref()
+            if ledger is not None:
+                ledger._changed(self)
+
+    def _attach(self, ref):
+        """
+        Record (by weak reference) a ledger holding this transaction,
+        dropping any ledgers since discarded.
+        """
+        self._ledgers = (
+            *(other for other in self._ledgers if other() is not None),
+            ref,
+        )
 
     def get_amount(self, descriptor=None):
         """
         The total of the amounts of the designations of this transaction
         that don't match the descriptor (or all if no descriptor supplied).
         """
+        if descriptor is None:
+            return self.amount
         return sum(
             item.amount
-            for item in jaraco.itertools.always_iterable(self.designation)
-            if descriptor is None or descriptor == item.descriptor
+            for item in _items(self.designation)
+            if descriptor == item.descriptor
         )
 
-    amount = property(get_amount)
+    @property
+    def amount(self):
+        """
+        The total of the designations, cached until the designation
+        is replaced or (if a SplitDesignation) changed.
+        """
+        designation = self.designation
+        version = getattr(designation, 'version', None)
+        cached = self._total
+        if cached and cached[0] is designation and cached[1] == version:
+            return cached[2]
+        total = sum(item.amount for item in _items(designation))
+        # a Ledger has no version, so isn't cached
+        if designation is None or version is not None:
+            self._total = designation, version, total
+        return total
 
     # for the purpose of sorting transactions chronologically, sort by date
     def __lt__(self, other):
@@ -45,52 +154,565 @@ class Transaction:
         return hash(self._identity())
 
 
-class SplitDesignation(list):
-    "A list of SimpleDesignations"
+def _items(designation):
+    """
+    The designations making up designation (a quicker always_iterable
+    for the common SimpleDesignation).
+    """
+    if isinstance(designation, SimpleDesignation):
+        return (designation,)
+    return jaraco.itertools.always_iterable(designation)
+
+
+class _Observed:
+    """
+    A designation that may change, telling the transactions it
+    designates so that the ledgers holding them stay current.
+
+    The transactions are held by weak reference (by id, as they
+    compare by value), so a designation doesn't keep them alive.
+    """
+
+    def _watch(self, txn):
+        watchers = vars(self).setdefault('_watchers', {})
+        key = id(txn)
+
+        def forget(ref):
+            if watchers.get(key) is ref:
+                del watchers[key]
+
+        watchers[key] = weakref.ref(txn, forget)
+
+    def _unwatch(self, txn):
+        vars(self).get('_watchers', {}).pop(id(txn), None)
+
+    def _notify(self):
+        for ref in list(getattr(self, '_watchers', {}).values()):
+            txn = ref()
+            if txn is not None:
+                txn._changed()
+
+
+def _versioned(method):
+    """
+    Wrap the list method to count the changes it makes and tell the
+    transactions designated.
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        self.version += 1
+        result = method(self, *args, **kwargs)
+        self._notify()
+        return result
+
+    return wrapper
+
+
+class SplitDesignation(_Observed, list):
+    """
+    A list of SimpleDesignations, counting its changes in ``version``
+    so that transactions can cache their totals.
+    """
+
+    version = 0
+
+    __setitem__ = _versioned(list.__setitem__)
+    __delitem__ = _versioned(list.__delitem__)
+    __iadd__ = _versioned(list.__iadd__)
+    __imul__ = _versioned(list.__imul__)
+    append = _versioned(list.append)
+    extend = _versioned(list.extend)
+    insert = _versioned(list.insert)
+    pop = _versioned(list.pop)
+    remove = _versioned(list.remove)
+    clear = _versioned(list.clear)
+
+    def __reduce__(self):
+        return type(self), (list(self),)
+
+
+def _decimal(value):
+    """
+    The value as a Decimal, taking a float as it's written (so 0.1
+    is Decimal('0.1') and not its binary approximation).
+    """
+    return decimal.Decimal(str(value) if isinstance(value, float) else value)
+
+
+def _cents(amount):
+    return int(_decimal(amount).scaleb(2).to_integral_value())
 
 
 class SimpleDesignation:
+    """
+    An amount designated to a descriptor.
+
+    The amount is held in integer cents where it's a whole number of
+    cents and exactly otherwise, so that proportions of an amount
+    (as by ``*``) aren't rounded. ``cents`` is the amount rounded
+    (half-even) to the cent.
+
+    Designations are immutable, so they may be shared and hashed.
+
+    >>> food = SimpleDesignation('food', decimal.Decimal('12.345'))
+    >>> food.amount, food.cents, -food == SimpleDesignation('food', '-12.345')
+    (Decimal('12.345'), 1234, True)
+    >>> len({food, SimpleDesignation('food', '12.3450')})
+    1
+    >>> thirds = [SimpleDesignation('rent', 100) * (decimal.Decimal(1) / 3)] * 3
+    >>> total = sum(third.amount for third in thirds)
+    >>> total
+    Decimal('99.99999999999999999999999999')
+    >>> round(total, 2), sum(third.cents for third in thirds)
+    (Decimal('100.00'), 9999)
+
+    Floats are taken as they're written, as amounts or proportions.
+
+    >>> SimpleDesignation('fee', 0.1).amount
+    Decimal('0.10')
+    >>> (SimpleDesignation('rent', 10) * 0.5).amount
+    Decimal('5.00')
+    >>> (SimpleDesignation('rent', '0.03') * 0.5).amount
+    Decimal('0.015')
+
+    >>> food.descriptor = 'fun'
+    Traceback (most recent call last):
+    ...
+    AttributeError: SimpleDesignation is immutable
+    """
+
+    __slots__ = '_value', 'descriptor', 'memo'
+
     def __init__(self, descriptor, amount, memo=None):
-        self.descriptor = descriptor
-        self.amount = amount
-        self.memo = memo
+        amount = _decimal(amount)
+        cents = amount.scaleb(2)
+        value = int(cents) if cents == cents.to_integral_value() else amount
+        object.__setattr__(self, 'descriptor', descriptor)
+        object.__setattr__(self, '_value', value)
+        object.__setattr__(self, 'memo', memo)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __delattr__(self, name):
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __reduce__(self):
+        return type(self), (self.descriptor, self.amount, self.memo)
+
+    def __repr__(self):
+        return (
+            f'{type(self).__name__}({self.descriptor!r}, {self.amount!r}, '
+            f'{self.memo!r})'
+        )
+
+    @property
+    def amount(self):
+        value = self._value
+        if isinstance(value, int):
+            return decimal.Decimal(value).scaleb(-2)
+        return value
+
+    @property
+    def cents(self):
+        value = self._value
+        return value if isinstance(value, int) else _cents(value)
+
+    def _identity(self):
+        return self.descriptor, self._value, self.memo
 
     def __eq__(self, other):
-        return vars(self) == vars(other)
+        if not isinstance(other, SimpleDesignation):
+            return NotImplemented
+        return self._identity() == other._identity()
 
     def __hash__(self):
-        return hash(vars(self))
+        return hash(self._identity())
 
     def __neg__(self):
         return self * -1
 
     def __mul__(self, proportion):
         return SimpleDesignation(
-            descriptor=self.descriptor, amount=proportion * self.amount, memo=self.memo
+            descriptor=self.descriptor,
+            amount=_decimal(proportion) * self.amount,
+            memo=self.memo,
         )
 
 
-class Ledger(list):
+class _Sums:
     """
-    A list of transactions, sorted by date.
+    A Fenwick tree of the totals of the chunks, maintaining the sum
+    of any leading chunks in O(log n) as amounts are added.
+
+    >>> sums = _Sums([1, 2, 3, 4])
+    >>> sums.add(1, 10)
+    >>> sums.before(2), sums.before(4)
+    (13, 20)
     """
 
+    def __init__(self, values):
+        self.tree = [0, *values]
+        for index in range(1, len(self.tree)):
+            parent = index + (index & -index)
+            if parent < len(self.tree):
+                self.tree[parent] += self.tree[index]
+
+    def add(self, pos, amount):
+        index = pos + 1
+        while index < len(self.tree):
+            self.tree[index] += amount
+            index += index & -index
+
+    def before(self, pos):
+        """
+        The sum of the values before pos.
+        """
+        total = 0
+        while pos:
+            total += self.tree[pos]
+            pos -= pos & -pos
+        return total
+
+
+class Ledger(_Observed, collections.abc.Sequence):
+    """
+    A sequence of transactions, sorted by date.
+
+    The transactions are held in chunks of up to ``2 * chunk_size``,
+    each with a parallel list of dates, so that adding a transaction
+    shifts only the one chunk. The totals of the chunks are kept in
+    a Fenwick tree, and the running totals within each chunk cached,
+    so that balances take O(log n). Transactions are also indexed by
+    the descriptors and amounts of their designations and by payee,
+    for ``query``. A change to the payee or designation of a
+    transaction updates the ledgers holding it (but a transaction's
+    date must not change once it's added).
+
+    >>> class Small(Ledger):
+    ...     chunk_size = 2
+    >>> day = datetime.date(2026, 10, 1)
+    >>> ledger = Small(
+    ...     Transaction(date=day + datetime.timedelta(days=n % 7), payee=n)
+    ...     for n in range(20)
+    ... )
+    >>> ledger.add(Transaction(date=day, payee='last'))
+    >>> [txn.payee for txn in ledger[:4]]
+    [0, 7, 14, 'last']
+    >>> [txn.payee for txn in ledger.between(day + datetime.timedelta(days=5))]
+    [5, 12, 19, 6, 13]
+
+    >>> ledger.add(Transaction(date=day, designation=SimpleDesignation('pay', 100)))
+    >>> ledger.add(Transaction(date=day, designation=SimpleDesignation('rent', -30)))
+    >>> ledger.balance_through(day), ledger.balance
+    (Decimal('70.00'), Decimal('70.00'))
+    >>> ledger.balance_between(day + datetime.timedelta(days=1))
+    Decimal('0.00')
+    >>> [txn.amount for txn in ledger.query(descriptor='rent')]
+    [Decimal('-30.00')]
+
+    >>> split = SplitDesignation([SimpleDesignation('food', -20)])
+    >>> ledger.add(Transaction(date=day, designation=split))
+    >>> split.append(SimpleDesignation('home', -5))
+    >>> ledger.balance_through(day), ledger.balance
+    (Decimal('45.00'), Decimal('45.00'))
+    >>> [txn.amount for txn in ledger.query(descriptor='home')]
+    [Decimal('-25.00')]
+
+    Transactions refer to the ledgers holding them only weakly, so a
+    ledger that's discarded is freed.
+
+    >>> import weakref
+    >>> temporary = weakref.ref(Ledger([Transaction(date=day, designation=split)]))
+    >>> temporary() is None
+    True
+    """
+
+    chunk_size = 1000
+
+    def __init__(self, transactions=()):
+        self._chunks = []
+        self._dates = []
+        self._maxes = []
+        self._offsets = None
+        self._sums = _Sums([])
+        self._totals = []
+        self._prefixes = []
+        self._indexes = dict(
+            descriptor=collections.defaultdict(list),
+            amount=collections.defaultdict(list),
+            payee=collections.defaultdict(list),
+        )
+        self._seq = itertools.count()
+        self._stale = False
+        self.extend(transactions)
+
+    def __reduce__(self):
+        return type(self), (list(self),)
+
+    def __len__(self):
+        return sum(map(len, self._chunks))
+
+    def __iter__(self):
+        return itertools.chain.from_iterable(self._chunks)
+
+    def __reversed__(self):
+        for chunk in reversed(self._chunks):
+            yield from reversed(chunk)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self)[index]
+        if index < 0:
+            index += len(self)
+        offsets = self._get_offsets()
+        if not 0 <= index < (offsets[-1] if offsets else 0):
+            raise IndexError('Ledger index out of range')
+        pos = bisect.bisect_right(offsets, index)
+        return self._chunks[pos][index - (offsets[pos - 1] if pos else 0)]
+
+    def _get_offsets(self):
+        """
+        The cumulative lengths of the chunks.
+        """
+        if self._offsets is None:
+            self._offsets = list(itertools.accumulate(map(len, self._chunks)))
+        return self._offsets
+
+    def __contains__(self, txn):
+        return any(other == txn for other in self.between(txn.date, txn.date))
+
+    def __repr__(self):
+        return f'{type(self).__name__}({list(self)!r})'
+
+    def __eq__(self, other):
+        """
+        Ledgers compare (as lists did) by their transactions.
+
+        >>> Ledger() == Ledger() == []
+        True
+        """
+        if isinstance(other, Ledger):
+            other = list(other)
+        if not isinstance(other, list):
+            return NotImplemented
+        return list(self) == other
+
+    __hash__ = None
+
     def add(self, item):
-        bisect.insort(self, item)
+        """
+        Add the transaction after any others on the same date.
+        """
+        item._attach(weakref.ref(self))
+        entry = item.date, next(self._seq), item
+        for name, key in self._keys(item):
+            bisect.insort(self._indexes[name][key], entry)
+        self._offsets = None
+        if not self._chunks:
+            self._chunks.append([item])
+            self._dates.append([item.date])
+            self._reindex()
+            self._notify()
+            return
+        pos = min(bisect.bisect_right(self._maxes, item.date), len(self._maxes) - 1)
+        dates = self._dates[pos]
+        index = bisect.bisect_right(dates, item.date)
+        dates.insert(index, item.date)
+        self._chunks[pos].insert(index, item)
+        self._maxes[pos] = dates[-1]
+        amount = item.amount
+        self._totals[pos] += amount
+        self._sums.add(pos, amount)
+        self._prefixes[pos] = None
+        if len(dates) > 2 * self.chunk_size:
+            self._split(pos)
+        self._notify()
+
+    def _split(self, pos):
+        chunk, dates = self._chunks[pos], self._dates[pos]
+        half = len(chunk) // 2
+        self._chunks[pos : pos + 1] = chunk[:half], chunk[half:]
+        self._dates[pos : pos + 1] = dates[:half], dates[half:]
+        self._maxes[pos : pos + 1] = dates[half - 1], dates[-1]
+        self._prefixes[pos : pos + 1] = None, None
+        total = self._totals[pos]
+        first = sum(txn.amount for txn in chunk[:half])
+        self._totals[pos : pos + 1] = first, total - first
+        self._sums = _Sums(self._totals)
+
+    def extend(self, transactions):
+        """
+        Add the transactions, sorting them once and merging them
+        with those already in the ledger.
+        """
+        new = sorted(transactions, key=operator.attrgetter('date'))
+        if not new:
+            return
+        touched = set()
+        ref = weakref.ref(self)
+        for item in new:
+            item._attach(ref)
+            entry = item.date, next(self._seq), item
+            for name, key in self._keys(item):
+                self._indexes[name][key].append(entry)
+                touched.add((name, key))
+        for name, key in touched:
+            self._indexes[name][key].sort()
+        merged = list(heapq.merge(self, new, key=operator.attrgetter('date')))
+        size = self.chunk_size
+        self._chunks = [merged[n : n + size] for n in range(0, len(merged), size)]
+        self._dates = [[txn.date for txn in chunk] for chunk in self._chunks]
+        self._offsets = None
+        self._reindex()
+        self._notify()
+
+    def _changed(self, txn):
+        """
+        Update the totals for a change to the payee or designation of
+        a transaction in the ledger, leaving the indexes for ``query``
+        to be rebuilt when next needed.
+        """
+        self._stale = True
+        pos = self._locate(txn)
+        if pos is None:
+            self._reindex()
+        else:
+            total = sum(other.amount for other in self._chunks[pos])
+            self._sums.add(pos, total - self._totals[pos])
+            self._totals[pos] = total
+            self._prefixes[pos] = None
+        self._notify()
+
+    def _locate(self, txn):
+        """
+        The position of the chunk holding the transaction (or None if
+        it's not found under its date).
+        """
+        start = bisect.bisect_left(self._maxes, txn.date)
+        for pos in range(start, len(self._chunks)):
+            dates = self._dates[pos]
+            first = bisect.bisect_left(dates, txn.date)
+            last = bisect.bisect_right(dates, txn.date)
+            if any(other is txn for other in self._chunks[pos][first:last]):
+                return pos
+            if last < len(dates):
+                return None
+        return None
+
+    def _reindex(self):
+        """
+        Rebuild the indexes of the chunks after they were rearranged.
+        """
+        self._maxes = [dates[-1] for dates in self._dates]
+        self._prefixes = [
+            list(itertools.accumulate((txn.amount for txn in chunk), initial=0))
+            for chunk in self._chunks
+        ]
+        self._totals = [prefix[-1] for prefix in self._prefixes]
+        self._sums = _Sums(self._totals)
+
+    def _prefix(self, date, inclusive=True):
+        """
+        The total of the transactions before date (or through date if
+        inclusive).
+        """
+        bisect_ = bisect.bisect_right if inclusive else bisect.bisect_left
+        pos = bisect_(self._maxes, date)
+        total = self._sums.before(pos)
+        if pos == len(self._chunks):
+            return total
+        prefix = self._prefixes[pos]
+        if prefix is None:
+            amounts = (txn.amount for txn in self._chunks[pos])
+            prefix = self._prefixes[pos] = list(
+                itertools.accumulate(amounts, initial=0)
+            )
+        return total + prefix[bisect_(self._dates[pos], date)]
+
+    def between(self, start=None, end=None):
+        """
+        Generate the transactions from start through end (inclusive),
+        either of which may be omitted.
+        """
+        pos = 0 if start is None else bisect.bisect_left(self._maxes, start)
+        index = 0 if start is None else None
+        for chunk, dates in zip(self._chunks[pos:], self._dates[pos:]):
+            if index is None:
+                index = bisect.bisect_left(dates, start)
+            stop = len(dates) if end is None else bisect.bisect_right(dates, end)
+            yield from chunk[index:stop]
+            if stop < len(dates):
+                return
+            index = 0
 
     @property
     def balance(self):
-        return sum(txn.amount for txn in self)
+        return self._sums.before(len(self._chunks))
 
     def balance_through(self, date):
         """
         Return the balance up to and including a given date.
         """
-        return sum(txn.amount for txn in self if txn.date <= date)
+        return self._prefix(date)
 
-    def query(self, descriptor=None, amount=None):
-        for txn in self:
-            dsgns = jaraco.itertools.always_iterable(txn.designation)
+    def balance_between(self, start=None, end=None):
+        """
+        Return the total of the transactions from start through end
+        (inclusive), either of which may be omitted.
+        """
+        if None not in (start, end) and start > end:
+            return 0
+        total = self.balance if end is None else self._prefix(end)
+        return total - (0 if start is None else self._prefix(start, inclusive=False))
+
+    @staticmethod
+    def _keys(txn):
+        """
+        The keys under which to index the transaction.
+        """
+        keys = {('payee', txn.payee)} if txn.payee is not None else set()
+        for designation in _items(txn.designation):
+            descriptor = getattr(designation, 'descriptor', None)
+            if descriptor:
+                keys.add(('descriptor', descriptor))
+            keys.add(('amount', designation.amount))
+        return keys
+
+    def _index(self):
+        """
+        Rebuild the indexes for ``query`` after transactions changed.
+        """
+        self._indexes = {name: collections.defaultdict(list) for name in self._indexes}
+        self._seq = itertools.count()
+        for item in self:
+            entry = item.date, next(self._seq), item
+            for name, key in self._keys(item):
+                self._indexes[name][key].append(entry)
+        self._stale = False
+
+    def query(self, descriptor=None, amount=None, payee=None):
+        """
+        Generate the transactions with a designation matching the
+        descriptor and amount (and for the payee), in date order.
+        """
+        if self._stale:
+            self._index()
+        criteria = dict(descriptor=descriptor or None, amount=amount, payee=payee)
+        entries = [
+            self._indexes[name].get(key, [])
+            for name, key in criteria.items()
+            if key is not None
+        ]
+        # scan the smallest of the indexes, checking the other criteria
+        candidates = (
+            (txn for date, seq, txn in min(entries, key=len)) if entries else self
+        )
+        for txn in candidates:
+            if payee is not None and txn.payee != payee:
+                continue
+            dsgns = _items(txn.designation)
             for designation in dsgns:
                 if descriptor and designation.descriptor != descriptor:
                     continue
@@ -111,3 +733,79 @@ class Account(Named, Ledger):
     """
     A named ledger
     """
+
+    def __reduce__(self):
+        return type(self), (self.name, list(self))
+
+
+class Book(dict):
+    """
+    Accounts by name, with a register of the transactions of all the
+    accounts merged in date order as they are read.
+
+    >>> day = datetime.date(2026, 10, 1)
+    >>> def txn(days, amount):
+    ...     return Transaction(
+    ...         date=day + datetime.timedelta(days=days),
+    ...         designation=SimpleDesignation('', amount),
+    ...     )
+    >>> book = Book([
+    ...     Account('checking', [txn(0, 100), txn(2, -20), txn(4, -5)]),
+    ...     Account('savings', [txn(1, 50), txn(2, 10)]),
+    ... ])
+    >>> for account, txn, total in book.running(start=day.replace(day=2)):
+    ...     print(account.name, txn.date, total)
+    savings 2026-10-02 150.00
+    checking 2026-10-03 130.00
+    savings 2026-10-03 140.00
+    checking 2026-10-05 135.00
+    >>> book.balance_through(day.replace(day=3))
+    Decimal('140.00')
+    """
+
+    def __init__(self, accounts=()):
+        super().__init__((account.name, account) for account in accounts)
+
+    def add(self, account):
+        self[account.name] = account
+
+    def register(self, start=None, end=None):
+        """
+        Generate (account, transaction) for the transactions of all
+        the accounts from start through end (inclusive), in date order
+        (and on the same date, in the order of the accounts).
+        """
+        streams = (
+            zip(itertools.repeat(account), account.between(start, end))
+            for account in self.values()
+        )
+        return heapq.merge(*streams, key=lambda item: item[1].date)
+
+    def running(self, start=None, end=None):
+        """
+        Generate (account, transaction, total) for the register from
+        start through end, with the total of all the accounts through
+        each transaction.
+        """
+        total = (
+            0
+            if start is None
+            else sum(
+                account.balance - account.balance_between(start)
+                for account in self.values()
+            )
+        )
+        for account, txn in self.register(start, end):
+            total += txn.amount
+            yield account, txn, total
+
+    @property
+    def balance(self):
+        return sum(account.balance for account in self.values())
+
+    def balance_through(self, date):
+        """
+        Return the balance of all the accounts up to and including
+        a given date.
+        """
+        return sum(account.balance_through(date) for account in self.values())
@@ -0,0 +1,167 @@
+"""
+Timings (and byte counts) of the phases of downloading each account,
+for export as JSON lines or in the Prometheus text format.
+
+The module-level :func:`phase` records only once :func:`enable` has
+installed a recorder, so library callers accumulate nothing.
+
+>>> recorder = Recorder()
+>>> with account('bank 1234'):
+...     with recorder.phase('transfer') as sample:
+...         sample.bytes += 2048
+>>> with recorder.phase('keyring', account='bank me'):
+...     pass
+>>> [(sample.account, sample.phase, sample.bytes) for sample in recorder]
+[('bank 1234', 'transfer', 2048), ('bank me', 'keyring', 0)]
+>>> print(recorder.prometheus().splitlines()[2])
+ofx_phase_runs_total{account="bank 1234",phase="transfer"} 1
+
+>>> with phase('validate'):
+...     pass
+>>> installed = enable()
+>>> with phase('validate'):
+...     pass
+>>> [sample.phase for sample in installed]
+['validate']
+>>> disable()
+"""
+
+from __future__ import annotations
+
+import collections
+import contextlib
+import contextvars
+import json
+import threading
+import time
+
+current_account = contextvars.ContextVar('current_account', default=None)
+
+
+@contextlib.contextmanager
+def account(label):
+    """
+    Attribute the phases in this context to the account.
+    """
+    token = current_account.set(label)
+    try:
+        yield
+    finally:
+        current_account.reset(token)
+
+
+class Sample:
+    """
+    The duration of one phase for an account, and the bytes it handled.
+    """
+
+    def __init__(self, account, phase, started):
+        self.account = account
+        self.phase = phase
+        self.started = started
+        self.seconds = 0.0
+        self.bytes = 0
+
+    def __json__(self):
+        return dict(vars(self))
+
+
+def _label(value):
+    escaped = str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+    return f'"{escaped}"'
+
+
+class Recorder(list):
+    """
+    The samples recorded, from any thread or task.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def phase(self, name, account=None):
+        """
+        Time the phase, for the account (else the current account).
+        """
+        sample = Sample(account or current_account.get(), name, time.time())
+        start = time.perf_counter()
+        try:
+            yield sample
+        finally:
+            sample.seconds = time.perf_counter() - start
+            with self._lock:
+                self.append(sample)
+
+    def totals(self):
+        """
+        The count, seconds and bytes for each (account, phase).
+        """
+        totals = collections.defaultdict(lambda: [0, 0.0, 0])
+        for sample in list(self):
+            total = totals[sample.account, sample.phase]
+            total[0] += 1
+            total[1] += sample.seconds
+            total[2] += sample.bytes
+        return totals
+
+    def json_lines(self):
+        return ''.join(json.dumps(sample.__json__()) + '\n' for sample in list(self))
+
+    def prometheus(self):
+        metrics = dict(
+            runs_total='Times the phase ran',
+            seconds_total='Seconds spent in the phase',
+            bytes_total='Bytes handled in the phase',
+        )
+        totals = self.totals()
+        lines = []
+        for index, (metric, help) in enumerate(metrics.items()):
+            lines += [f'# HELP ofx_phase_{metric} {help}']
+            lines += [f'# TYPE ofx_phase_{metric} counter']
+            lines += [
+                f'ofx_phase_{metric}{{account={_label(account)},'
+                f'phase={_label(phase)}}} {values[index]}'
+                for (account, phase), values in totals.items()
+            ]
+        return '\n'.join(lines) + '\n'
+
+    def save(self, filename):
+        """
+        Save the samples to filename, in the Prometheus text format
+        if it ends with '.prom', else as JSON lines.
+        """
+        prometheus = str(filename).endswith('.prom')
+        text = self.prometheus() if prometheus else self.json_lines()
+        with open(filename, 'w', encoding='utf-8') as stream:
+            stream.write(text)
+
+
+recorder = None
+"The installed Recorder, if any."
+
+
+def enable():
+    """
+    Install a new recorder for :func:`phase`, returning it.
+    """
+    global recorder
+    recorder = Recorder()
+    return recorder
+
+
+def disable():
+    global recorder
+    recorder = None
+
+
+@contextlib.contextmanager
+def phase(name, account=None):
+    """
+    Time the phase with the installed recorder, if any.
+    """
+    if recorder is None:
+        yield Sample(account, name, None)
+        return
+    with recorder.phase(name, account) as sample:
+        yield sample
@@ -1,38 +1,136 @@
+from __future__ import annotations
+
 import argparse
+import collections
+import collections.abc
+import concurrent.futures
+import contextlib
 import datetime
+import functools
 import getpass
+import gzip
 import inspect
 import itertools
 import json
 import logging
+import os
 import re
+import sys
+import tempfile
+import threading
 import typing
 import uuid
 import warnings
-from importlib import metadata, resources
 
-import dateutil.parser
-import keyring
-import ofxparse
+if sys.version_info >= (3, 10):
+    from importlib import metadata
+else:  # pragma: no cover
+    import importlib_metadata as metadata
+
+import more_itertools
 import path
-import requests
-from urllib3.connectionpool import HTTPConnection
 
-import jaraco.collections
 import jaraco.logging
 from jaraco.functools import invoke
 from jaraco.ui import cmdline
 
-try:
-    import yaml
-except ImportError:
-    pass
-
-from . import msmoney
+from . import (
+    cassettes,
+    fitids,
+    metrics,
+    msmoney,
+    ofxstream,
+    scheduling,
+    sessions,
+)
+from .ofxstream import open_ofx
 
 log = logging.getLogger(__name__)
 
-sites = dict()
+
+class Sites(collections.abc.MutableMapping):
+    """
+    The institutions by name, loaded on first use.
+
+    Loading the institutions imports every plugin and parses the
+    institutions file, so the merged result is cached under the root
+    and reused until the file or the plugin distributions change.
+    """
+
+    def __init__(self):
+        self._data = None
+        self._complete = False
+
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = self._load_cached()
+        return self._data
+
+    def __getitem__(self, name):
+        return self.data[name]
+
+    def __setitem__(self, name, value):
+        self.data[name] = value
+
+    def __delitem__(self, name):
+        del self.data[name]
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __len__(self):
+        return len(self.data)
+
+    def load(self):
+        """
+        Load the institutions afresh.
+        """
+        loaded, self._complete = _load_sites_from_entry_points()
+        self._data = {**loaded, **_load_sites_from_file()}
+        return self._data
+
+    @staticmethod
+    def _cache_path():
+        return Base.root / '.cache' / 'institutions.json'
+
+    @staticmethod
+    def _key():
+        """
+        Capture the state of the sources of the institutions, without
+        importing the plugins.
+        """
+        sites_file = _sites_file()
+        eps = sorted(
+            [ep.name, ep.value, ep.dist.name, ep.dist.version] for ep in _entry_points()
+        )
+        return dict(
+            mtime=sites_file.stat().st_mtime if sites_file.exists() else None,
+            entry_points=eps,
+        )
+
+    def _load_cached(self):
+        key = self._key()
+        cache = self._cache_path()
+        with contextlib.suppress(FileNotFoundError, ValueError, KeyError):
+            cached = json.loads(cache.read_text())
+            if cached['key'] == key:
+                return cached['sites']
+        data = self.load()
+        if not self._complete:
+            # retry the plugins that failed on the next run
+            return data
+        try:
+            serialized = json.dumps(dict(key=key, sites=data)).encode()
+            cache.parent.makedirs_p()
+            with replacing(cache) as out:
+                out.write(serialized)
+        except (TypeError, OSError):
+            log.debug("Unable to cache institutions", exc_info=True)
+        return data
+
+
+sites = Sites()
 
 
 @invoke
@@ -49,8 +147,11 @@ def disable_future_warning():
 
 
 def load_sites():
-    _load_sites_from_entry_points()
-    _load_sites_from_file()
+    sites.load()
+
+
+def _entry_points():
+    return metadata.entry_points(group='financial_institutions')
 
 
 def _load_sites_from_entry_points():
@@ -68,27 +169,45 @@ def _load_sites_from_entry_points():
 
     Where `institutions` is a dictionary mapping institution name to
     institution details.
-    """
 
-    for ep in resources.entry_points(group='financial_institutions'):
+    Return the institutions loaded and whether every entry point
+    loaded.
+    """
+    loaded = {}
+    complete = True
+    for ep in _entry_points():
         try:
             log.info('Loading %s', ep.name)
             detail = ep.load()
-            sites.update(detail)
+            loaded.update(detail)
         except Exception:
             log.exception(f"Error initializing institution {ep}.")
+            complete = False
+    return loaded, complete
+
+
+def _yaml():
+    """
+    Import yaml (an optional dependency) only when needed.
+    """
+    try:
+        import yaml
+    except ImportError:
+        return None
+    return yaml
+
+
+def _sites_file():
+    return Base.root / 'institutions.yaml'
 
 
 def _load_sites_from_file():
-    if 'yaml' not in globals():
-        return
-    sites_file = path.Path('~/Documents/Financial/institutions.yaml')
-    sites_file = sites_file.expanduser()
-    if not sites_file.exists():
-        return
+    sites_file = _sites_file()
+    yaml = _yaml()
+    if yaml is None or not sites_file.exists():
+        return {}
     with sites_file.open() as stream:
-        new_sites = yaml.safe_load(stream)
-    sites.update(new_sites)
+        return yaml.safe_load(stream)
 
 
 def _field(tag, value):
@@ -120,11 +239,18 @@ def handle_response(resp):
     handle a requests Response
     """
     if not resp.ok:
-        with open('err.txt', 'wb') as err_f:
-            err_f.write(resp.content)
+        log_error(resp.url, resp.content)
     resp.raise_for_status()
 
 
+def log_error(url, content, limit=2048):
+    """
+    Log (the start of) the body of an error response.
+    """
+    body = content[:limit].decode('cp1252', errors='replace')
+    log.warning(f'Error response from {url}: {body}')
+
+
 def sign_on_message(config):
     fidata = [_field("ORG", config["fiorg"])]
     if 'fid' in config:
@@ -172,18 +298,24 @@ class OFXClient:
     money_sunset = AppInfo('Money Plus', '1700')
 
     app = pyofx
-    session = requests.Session()
+    pool = sessions.Pool()
 
     def __init__(self, config, user, password):
         self.password = password
         self.user = user
-        self.config = config
+        # copy the config, as the same site may be shared by concurrent clients
+        self.config = config = dict(config)
         self.cookie = 3
+        self.trnuids = []
         config["user"] = user
         config["password"] = password
         config.setdefault('appid', self.app.id)
         config.setdefault('appver', self.app.version)
 
+    @property
+    def session(self):
+        return self.pool.get_session(self.config)
+
     def _cookie(self):
         self.cookie += 1
         return str(self.cookie)
@@ -198,7 +330,12 @@ class OFXClient:
 
     # this is from _ccreq below and reading page 176 of the latest OFX doc.
     def _bareq(self, bankid, acctid, dtstart, accttype):
-        req = _tag(
+        req = self._bastmt(bankid, acctid, dtstart, accttype)
+        return self._message("BANK", "STMT", req)
+
+    @staticmethod
+    def _bastmt(bankid, acctid, dtstart, accttype):
+        return _tag(
             "STMTRQ",
             _tag(
                 "BANKACCTFROM",
@@ -208,19 +345,26 @@ class OFXClient:
             ),
             _tag("INCTRAN", _field("DTSTART", dtstart), _field("INCLUDE", "Y")),
         )
-        return self._message("BANK", "STMT", req)
 
     def _ccreq(self, acctid, dtstart):
-        req = _tag(
+        return self._message("CREDITCARD", "CCSTMT", self._ccstmt(acctid, dtstart))
+
+    @staticmethod
+    def _ccstmt(acctid, dtstart):
+        return _tag(
             "CCSTMTRQ",
             _tag("CCACCTFROM", _field("ACCTID", acctid)),
             _tag("INCTRAN", _field("DTSTART", dtstart), _field("INCLUDE", "Y")),
         )
-        return self._message("CREDITCARD", "CCSTMT", req)
 
     def _invstreq(self, brokerid, acctid, dtstart):
+        req = self._invstmt(brokerid, acctid, dtstart)
+        return self._message("INVSTMT", "INVSTMT", req)
+
+    @staticmethod
+    def _invstmt(brokerid, acctid, dtstart):
         dtnow = _date()
-        req = _tag(
+        return _tag(
             "INVSTMTRQ",
             _tag("INVACCTFROM", _field("BROKERID", brokerid), _field("ACCTID", acctid)),
             _tag("INCTRAN", _field("DTSTART", dtstart), _field("INCLUDE", "Y")),
@@ -228,17 +372,24 @@ class OFXClient:
             _tag("INCPOS", _field("DTASOF", dtnow), _field("INCLUDE", "Y")),
             _field("INCBAL", "Y"),
         )
-        return self._message("INVSTMT", "INVSTMT", req)
 
-    def _message(self, msgType, trnType, request):
+    def _message(self, msgType, trnType, *requests):
+        """
+        Wrap the requests in a message set, each in its own transaction.
+        """
         return _tag(
             msgType + "MSGSRQV1",
-            _tag(
-                trnType + "TRNRQ",
-                _field("TRNUID", _genuuid()),
-                _field("CLTCOOKIE", self._cookie()),
-                request,
-            ),
+            *(self._transaction(trnType, request) for request in requests),
+        )
+
+    def _transaction(self, trnType, request):
+        trnuid = _genuuid()
+        self.trnuids.append(trnuid)
+        return _tag(
+            trnType + "TRNRQ",
+            _field("TRNUID", trnuid),
+            _field("CLTCOOKIE", self._cookie()),
+            request,
         )
 
     def _header(self):
@@ -285,69 +436,509 @@ class OFXClient:
             _tag("OFX", self.sign_on(), self._invstreq(brokerid, acctid, dtstart)),
         ])
 
-    def doQuery(self, query, name):
-        headers = {
-            "Content-type": "application/x-ofx",
-            "Accept": "*/*, application/x-ofx",
-        }
+    def baBatchQuery(self, bankid, accounts):
+        """
+        Bank account statement request for each of the accounts, given
+        as (acctid, dtstart, accttype), in a single message.
+        """
+        reqs = (self._bastmt(bankid, *account) for account in accounts)
+        return self._batch("BANK", "STMT", reqs)
 
-        resp = self.session.post(
-            url=self.config["url"], data=query.encode('cp1252'), headers=headers
-        )
+    def ccBatchQuery(self, accounts):
+        """
+        CC statement request for each of the accounts, given as
+        (acctid, dtstart), in a single message.
+        """
+        reqs = (self._ccstmt(*account) for account in accounts)
+        return self._batch("CREDITCARD", "CCSTMT", reqs)
+
+    def invstBatchQuery(self, brokerid, accounts):
+        """
+        Investment statement request for each of the accounts, given
+        as (acctid, dtstart), in a single message.
+        """
+        reqs = (self._invstmt(brokerid, *account) for account in accounts)
+        return self._batch("INVSTMT", "INVSTMT", reqs)
+
+    def _batch(self, msgType, trnType, requests):
+        return '\r\n'.join([
+            self._header(),
+            _tag("OFX", self.sign_on(), self._message(msgType, trnType, *requests)),
+        ])
 
+    headers = {
+        "Content-type": "application/x-ofx",
+        "Accept": "*/*, application/x-ofx",
+    }
+
+    chunk_size = 64 * 1024
+
+    timeout = 60
+    "Seconds to wait on the institution (may be overridden by its config)."
+
+    def doQuery(self, query, name):
+        """
+        Post the query and stream the response to name, compressed
+        if name ends with '.gz'.
+        """
+        with metrics.phase('request'):
+            resp = self.session.post(
+                url=self.config["url"],
+                data=query.encode('cp1252'),
+                headers=self.headers,
+                stream=True,
+                timeout=self.config.get('timeout', self.timeout),
+            )
+        with resp:
+            handle_response(resp)
+
+            check_content_type(resp.headers['Content-type'])
+
+            with metrics.phase('transfer') as sample, replacing(name) as outfile:
+                for chunk in resp.iter_content(self.chunk_size):
+                    outfile.write(chunk)
+                    sample.bytes += len(chunk)
+
+    def doBatchQuery(self, query, names):
+        """
+        Post the batch query and split the response into a statement
+        for each transaction, saved to the name supplied for that
+        transaction (in the order the transactions were requested).
+        """
+        with metrics.phase('request'):
+            resp = self.session.post(
+                url=self.config["url"],
+                data=query.encode('cp1252'),
+                headers=self.headers,
+                timeout=self.config.get('timeout', self.timeout),
+            )
         handle_response(resp)
+        check_content_type(resp.headers['Content-type'])
+        with metrics.phase('transfer') as sample:
+            save_statements(resp.content, dict(zip(self.trnuids, names)))
+            sample.bytes = len(resp.content)
+
+
+def split_statements(content):
+    r"""
+    Split an OFX response containing several transactions into
+    a separate response for each, keyed by TRNUID.
+
+    >>> signon = (
+    ...     b'<SIGNONMSGSRSV1><SONRS><STATUS><CODE>0</STATUS></SONRS>'
+    ...     b'</SIGNONMSGSRSV1>'
+    ... )
+    >>> doc = (
+    ...     b'OFXHEADER:100\n\n<OFX>' + signon + b'<BANKMSGSRSV1>'
+    ...     b'<STMTTRNRS><TRNUID>a<STMTRS>1</STMTRS></STMTTRNRS>'
+    ...     b'<STMTTRNRS><TRNUID>b<STMTRS>2</STMTRS></STMTTRNRS>'
+    ...     b'</BANKMSGSRSV1></OFX>'
+    ... )
+    >>> statements = dict(split_statements(doc))
+    >>> print(statements['b'].decode().replace('><', '>\n<'))
+    OFXHEADER:100
+    <BLANKLINE>
+    <OFX>
+    <SIGNONMSGSRSV1>
+    <SONRS>
+    <STATUS>
+    <CODE>0</STATUS>
+    </SONRS>
+    </SIGNONMSGSRSV1>
+    <BANKMSGSRSV1>
+    <STMTTRNRS>
+    <TRNUID>b<STMTRS>2</STMTRS>
+    </STMTTRNRS>
+    </BANKMSGSRSV1>
+    </OFX>
+
+    A response that isn't OFX, or whose signon failed, or with a
+    transaction that can't be attributed, is invalid.
+
+    >>> dict(split_statements(b'<html>Service unavailable</html>'))
+    Traceback (most recent call last):
+    ...
+    jaraco.financial.ofxstream.Invalid: Missing OFX header
+    >>> dict(split_statements(doc.replace(
+    ...     b'<CODE>0', b'<CODE>15500<SEVERITY>ERROR<MESSAGE>Bad password'
+    ... )))
+    Traceback (most recent call last):
+    ...
+    jaraco.financial.ofxstream.Invalid: SONRS failed with code 15500: Bad password
+    >>> dict(split_statements(doc.replace(b'<TRNUID>b', b'')))
+    Traceback (most recent call last):
+    ...
+    jaraco.financial.ofxstream.Invalid: STMTTRNRS without TRNUID
+    """
+    ofxstream.check_signon([content])
+    head, _, body = content.partition(b'<OFX>')
+    sets = {
+        match.group(1): match
+        for match in re.finditer(rb'<(\w+MSGSRSV1)>(.*?)</\1>', body, re.DOTALL)
+    }
+    if b'SIGNONMSGSRSV1' not in sets:
+        raise ofxstream.Invalid('No signon response')
+    signon = sets.pop(b'SIGNONMSGSRSV1').group(0)
+    seclist = (
+        sets.pop(b'SECLISTMSGSRSV1').group(0) if b'SECLISTMSGSRSV1' in sets else b''
+    )
+    for name, match in sets.items():
+        start, end = b'<' + name + b'>', b'</' + name + b'>'
+        for trn in re.finditer(rb'<(\w+TRNRS)>.*?</\1>', match.group(2), re.DOTALL):
+            trnuid = re.search(rb'<TRNUID>\s*([^<\s]+)', trn.group(0))
+            if not trnuid:
+                raise ofxstream.Invalid(f'{trn.group(1).decode()} without TRNUID')
+            statement = start + trn.group(0) + end
+            yield (
+                trnuid.group(1).decode(),
+                b''.join([head, b'<OFX>', signon, statement, seclist, b'</OFX>']),
+            )
+
+
+def save_statements(content, names):
+    """
+    Save each statement in the content to the name for its TRNUID.
+    """
+    for trnuid, statement in split_statements(content):
+        if trnuid not in names:
+            raise ofxstream.Invalid(f"Unexpected TRNUID {trnuid}")
+        with replacing(names.pop(trnuid)) as outfile:
+            outfile.write(statement)
+    if names:
+        missing = ', '.join(map(str, names.values()))
+        raise ofxstream.Invalid(f"No response for {missing}")
 
-        content_type = resp.headers['Content-type']
-        expected_types = 'application/x-ofx', 'application/qfx'
-        if content_type not in expected_types:
-            log.warning(f'Unexpected content type {content_type}')
 
-        with open(name, "wb") as outfile:
-            outfile.write(resp.content)
+def check_content_type(content_type):
+    expected_types = 'application/x-ofx', 'application/qfx'
+    if content_type not in expected_types:
+        log.warning(f'Unexpected content type {content_type}')
 
 
-class Account(dict, jaraco.collections.ItemsAsAttributes):
-    @property
-    def username(self):
-        return self.get('username', getpass.getuser())
+@contextlib.contextmanager
+def replacing(name):
+    """
+    Supply a binary file for writing the content of name (compressed
+    if name ends with '.gz'). The content is written to a temporary
+    file, which replaces name only when complete, so an interrupted
+    write never leaves a truncated file.
+    """
+    target = path.Path(os.path.abspath(name))
+    fd, tmp = tempfile.mkstemp(prefix=target.name, suffix='.tmp', dir=target.parent)
+    try:
+        with open(fd, 'wb') as raw:
+            compress = target.endswith('.gz')
+            with gzip.GzipFile(fileobj=raw, mode='wb') if compress else raw as out:
+                yield out
+        os.replace(tmp, target)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+
+class AsyncOFXClient(OFXClient):
+    """
+    An OFXClient whose :meth:`doQuery` is awaitable.
+
+    ``session`` is an ``aiohttp.ClientSession``, which may be shared
+    by any number of clients on the same event loop.
+    """
+
+    session = None
+
+    def __init__(self, config, user, password, session):
+        super().__init__(config, user, password)
+        self.session = session
+
+    def _post(self, query):
+        import aiohttp
+
+        timeout = aiohttp.ClientTimeout(total=self.config.get('timeout', self.timeout))
+        return self.session.post(
+            self.config["url"],
+            data=query.encode('cp1252'),
+            headers=self.headers,
+            timeout=timeout,
+        )
+
+    def _synchronous(self):
+        """
+        A synchronous client for this client's requests, which exchanges
+        through the cassette mounted on the pooled sessions.
+        """
+        client = OFXClient(self.config, self.user, self.password)
+        client.trnuids = self.trnuids
+        return client
+
+    async def doQuery(self, query, name):
+        import asyncio
+
+        if self.pool.cassette:
+            client = self._synchronous()
+            return await asyncio.to_thread(client.doQuery, query, name)
+        with metrics.phase('request'):
+            resp = await self._post(query)
+        async with resp:
+            if not resp.ok:
+                log_error(resp.url, await resp.read())
+            resp.raise_for_status()
+
+            check_content_type(resp.headers['Content-type'])
+
+            with metrics.phase('transfer') as sample, replacing(name) as outfile:
+                async for chunk in resp.content.iter_chunked(self.chunk_size):
+                    outfile.write(chunk)
+                    sample.bytes += len(chunk)
+
+    async def doBatchQuery(self, query, names):
+        import asyncio
+
+        if self.pool.cassette:
+            client = self._synchronous()
+            return await asyncio.to_thread(client.doBatchQuery, query, names)
+        with metrics.phase('request'):
+            async with self._post(query) as resp:
+                content = await resp.read()
+        if not resp.ok:
+            log_error(resp.url, content)
+        resp.raise_for_status()
+        check_content_type(resp.headers['Content-type'])
+        names = dict(zip(self.trnuids, names))
+        with metrics.phase('transfer') as sample:
+            await asyncio.to_thread(save_statements, content, names)
+            sample.bytes = len(content)
+
+
+class Account(typing.NamedTuple):
+    """
+    An account as defined in the accounts file.
+    """
+
+    institution: str
+    account: str
+    type: str | None = None
+    username: str = ''
+
+    @classmethod
+    def from_dict(cls, doc):
+        return cls(
+            institution=doc['institution'],
+            account=str(doc['account']),
+            type=doc.get('type'),
+            username=doc.get('username') or getpass.getuser(),
+        )
 
     def __str__(self):
-        return '{institution} ({account})'.format(**self)
+        return f'{self.institution} ({self.account})'
 
     def matches(self, query):
         return query.lower() in self.institution.lower()
 
 
+class Registry:
+    """
+    The accounts, indexed by institution.
+
+    >>> registry = Registry([
+    ...     Account('Chase', '1', username='me'),
+    ...     Account('Chase (credit card)', '2', username='me'),
+    ...     Account('Bank of America', '3', username='me'),
+    ...     Account('Chase', '4', username='me'),
+    ... ])
+    >>> [acct.account for acct in registry.matching('chase')]
+    ['1', '2', '4']
+    >>> registry.best('Chase (').account
+    '2'
+    >>> registry.best('Bank').account
+    '3'
+    """
+
+    def __init__(self, accounts):
+        self.accounts = list(accounts)
+        self.by_institution = collections.defaultdict(list)
+        for account in self.accounts:
+            self.by_institution[account.institution].append(account)
+        self._lowered = {name: name.lower() for name in self.by_institution}
+
+    def matching(self, query):
+        """
+        The accounts whose institutions contain the query (ignoring case),
+        in the order defined.
+        """
+        query = query.lower()
+        names = {name for name, lower in self._lowered.items() if query in lower}
+        return [account for account in self.accounts if account.institution in names]
+
+    def best(self, input):
+        """
+        The first account at the institution named input, else at
+        the first institution containing input.
+        """
+        if input in self.by_institution:
+            return self.by_institution[input][0]
+        name = next(name for name in self.by_institution if input in name)
+        return self.by_institution[name][0]
+
+
+class Download(typing.NamedTuple):
+    """
+    The parameters to a :meth:`Command.download`.
+    """
+
+    site: str
+    account: str
+    dt_start: str
+    creds: tuple[str, str]
+    account_type: str | None = None
+    compress: bool = False
+
+
 class DateAction(argparse.Action):
     def __call__(self, parser, namespace, values, option_string=None):
         value = values
+        import dateutil.parser
+
         value = dateutil.parser.parse(value)
         setattr(namespace, self.dest, value)
 
 
 class Command(cmdline.Command):
+    @classmethod
+    def download(
+        cls, site, account, dt_start, creds, account_type=None, compress=False
+    ):
+        client = OFXClient(sites[site], *creds)
+        with metrics.phase('query'):
+            query = cls.query(client, site, account, dt_start, account_type)
+        filename = cls.filename(site, account, compress)
+        client.doQuery(query, filename)
+        return filename
+
+    @classmethod
+    async def download_async(
+        cls, session, site, account, dt_start, creds, account_type=None, compress=False
+    ):
+        client = AsyncOFXClient(sites[site], *creds, session=session)
+        with metrics.phase('query'):
+            query = cls.query(client, site, account, dt_start, account_type)
+        filename = cls.filename(site, account, compress)
+        await client.doQuery(query, filename)
+        return filename
+
+    @classmethod
+    def download_batch(cls, downloads):
+        """
+        Download the statements for several accounts at one site,
+        sharing credentials, in a single request.
+        """
+        first = downloads[0]
+        client = OFXClient(sites[first.site], *first.creds)
+        with metrics.phase('query'):
+            query = cls.batch_query(client, first.site, downloads)
+        names = [
+            cls.filename(item.site, item.account, item.compress) for item in downloads
+        ]
+        client.doBatchQuery(query, names)
+        return names
+
+    @classmethod
+    async def download_batch_async(cls, session, downloads):
+        first = downloads[0]
+        client = AsyncOFXClient(sites[first.site], *first.creds, session=session)
+        with metrics.phase('query'):
+            query = cls.batch_query(client, first.site, downloads)
+        names = [
+            cls.filename(item.site, item.account, item.compress) for item in downloads
+        ]
+        await client.doBatchQuery(query, names)
+        return names
+
     @staticmethod
-    def download(site, account, dt_start, creds, account_type=None):
+    def query(client, site, account, dt_start, account_type=None):
+        """
+        Build the statement query for the account appropriate to the site.
+        """
         config = sites[site]
-        client = OFXClient(config, *creds)
-
-        caps = sites[site]['caps']
+        caps = config['caps']
         if "CCSTMT" in caps:
-            query = client.ccQuery(account, dt_start)
+            return client.ccQuery(account, dt_start)
         elif "INVSTMT" in caps:
-            query = client.invstQuery(sites[site]["fiorg"], account, dt_start)
+            return client.invstQuery(config["fiorg"], account, dt_start)
         elif "BASTMT" in caps:
             bank_id = config["bankid"]
-            query = client.baQuery(bank_id, account, dt_start, account_type)
+            return client.baQuery(bank_id, account, dt_start, account_type)
+
+    @staticmethod
+    def batch_query(client, site, downloads):
+        """
+        Build a single query for the statements of all of the downloads.
+        """
+        config = sites[site]
+        caps = config['caps']
+        if "CCSTMT" in caps:
+            return client.ccBatchQuery(
+                (item.account, item.dt_start) for item in downloads
+            )
+        elif "INVSTMT" in caps:
+            accounts = ((item.account, item.dt_start) for item in downloads)
+            return client.invstBatchQuery(config["fiorg"], accounts)
+        elif "BASTMT" in caps:
+            accounts = (
+                (item.account, item.dt_start, item.account_type) for item in downloads
+            )
+            return client.baBatchQuery(config["bankid"], accounts)
+
+    @staticmethod
+    def filename(site, account, compress=False):
         filename = '{site} {account} {dtnow}.ofx'.format(
             dtnow=datetime.datetime.now().strftime('%Y-%m-%d'), **vars()
         )
-        filename = path.Path(filename)
-        client.doQuery(query, filename)
-        return filename
+        return path.Path(filename + '.gz' * compress)
+
+    @staticmethod
+    def start_date(args, watermarks, site, account):
+        """
+        Resolve the start date for downloading the account: the date
+        specified, else the watermark less the overlap, else 31 days ago.
+        """
+        overlap = datetime.timedelta(days=args.overlap)
+        start = (
+            args.start_date
+            or watermarks.start(site, account, overlap)
+            or datetime.datetime.now() - datetime.timedelta(days=31)
+        )
+        return start.strftime("%Y%m%d")
+
+    @staticmethod
+    def add_start_arguments(parser):
+        parser.add_argument(
+            '-d',
+            '--start-date',
+            action=DateAction,
+            help="Download transactions since this date (default is since the "
+            "last download or the last 31 days).",
+        )
+        parser.add_argument(
+            '--overlap',
+            type=int,
+            default=3,
+            help="Days before the last download from which to start (default 3).",
+        )
+
+    @staticmethod
+    def add_compress_argument(parser):
+        parser.add_argument(
+            '-z',
+            '--compress',
+            default=False,
+            action="store_true",
+            help="Save the downloaded file compressed (.ofx.gz).",
+        )
 
     @staticmethod
     def _get_password(site, username):
+        import keyring
+
         password = keyring.get_password(site, username)
         if password is None:
             password = getpass.getpass(f"Password for {site}:{username}: ")
@@ -355,10 +946,76 @@ class Command(cmdline.Command):
         return password
 
 
+class Credentials:
+    """
+    Passwords for (site, username) pairs, resolved once and held in
+    memory (least-recently used first out) for the life of the run.
+
+    >>> resolved = []
+    >>> def resolve(site, username):
+    ...     resolved.append((site, username))
+    ...     return f'{username}@{site}'
+    >>> credentials = Credentials(resolve, maxsize=2)
+    >>> credentials.prefetch([('bank', 'alice'), ('card', 'alice'), ('bank', 'alice')])
+    >>> credentials.get('bank', 'alice'), credentials.get('card', 'alice')
+    ('alice@bank', 'alice@card')
+    >>> resolved
+    [('bank', 'alice'), ('card', 'alice')]
+
+    Beyond maxsize, the least recently used password is dropped and
+    resolved again when next needed.
+
+    >>> credentials.get('bank', 'bob')
+    'bob@bank'
+    >>> _ = credentials.get('card', 'alice'), credentials.get('bank', 'alice')
+    >>> resolved[2:]
+    [('bank', 'bob'), ('bank', 'alice')]
+
+    Clearing forgets them all.
+
+    >>> credentials.clear()
+    >>> _ = credentials.get('card', 'alice')
+    >>> len(resolved)
+    5
+    """
+
+    maxsize = 128
+
+    def __init__(self, resolve=None, maxsize=None):
+        self.resolve = resolve or Command._get_password
+        self.maxsize = maxsize or self.maxsize
+        self._cache = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def prefetch(self, pairs):
+        """
+        Resolve each distinct pair up front, as doing so may block on the
+        keyring or prompt the user.
+        """
+        for site, username in dict.fromkeys(pairs):
+            self.get(site, username)
+
+    def get(self, site, username):
+        key = site, username
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+            with metrics.phase('keyring', account=f'{site} {username}'):
+                password = self._cache[key] = self.resolve(site, username)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+            return password
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
 class Query(Command):
     @classmethod
     def add_arguments(cls, parser):
-        parser.add_argument('site', help="One of {}".format(', '.join(sites)))
+        parser.add_argument('site', help="The institution (see list-institutions)")
         parser.add_argument('-u', '--username', default=getpass.getuser())
         parser.add_argument('-a', '--account')
         parser.add_argument(
@@ -367,10 +1024,8 @@ class Query(Command):
             help="Required if retrieving bank statement, should be CHECKING, "
             "SAVINGS, ...",
         )
-        default_start = datetime.datetime.now() - datetime.timedelta(days=31)
-        parser.add_argument(
-            '-d', '--start-date', default=default_start, action=DateAction
-        )
+        cls.add_start_arguments(parser)
+        cls.add_compress_argument(parser)
 
     @classmethod
     def run(cls, args):
@@ -382,19 +1037,111 @@ class Query(Command):
             query = client.acctQuery("19700101000000")
             client.doQuery(query, args.site + "_acct.ofx")
         else:
-            dt_start = args.start_date.strftime("%Y%m%d")
-            cls.download(args.site, args.account, dt_start, creds, args.account_type)
+            watermarks = Watermarks.load()
+            dt_start = cls.start_date(args, watermarks, args.site, args.account)
+            ofx = cls.download(
+                args.site,
+                args.account,
+                dt_start,
+                creds,
+                args.account_type,
+                args.compress,
+            )
+            watermarks.record(args.site, args.account, ofx)
 
 
 class Base:
     root = path.Path('~/Documents/Financial').expanduser()
 
+    @classmethod
+    def store(cls):
+        """
+        The store of the transactions ingested under the root.
+        """
+        from . import store
+
+        return store.Store(cls.root / 'store')
+
+
+class Watermarks(Base, dict):
+    """
+    The end date (DTEND) of the last successful download of each
+    account, persisted under the root so that subsequent downloads
+    need only request the transactions since.
+    """
+
+    @classmethod
+    def _path(cls):
+        return cls.root / 'watermarks.json'
+
+    @classmethod
+    def load(cls):
+        try:
+            return cls(json.loads(cls._path().read_text()))
+        except FileNotFoundError:
+            return cls()
+
+    def save(self):
+        with replacing(self._path()) as out:
+            out.write(json.dumps(self, indent=2, sort_keys=True).encode())
+
+    def start(self, site, account, overlap):
+        """
+        Return the date from which to download the account, or None
+        if the account has not been downloaded.
+        """
+        try:
+            end = self[f'{site} {account}']
+        except KeyError:
+            return None
+        return datetime.datetime.strptime(end, '%Y%m%d') - overlap
+
+    def record(self, site, account, ofx_file):
+        end = self._end(ofx_file)
+        if not end:
+            log.warning(f'No DTEND found in {ofx_file}')
+            return
+        self[f'{site} {account}'] = end
+        self.save()
+
+    @staticmethod
+    def _end(ofx_file):
+        """
+        The date of the first DTEND in the file, reading only as far
+        as that tag.
+        """
+        with open_ofx(ofx_file) as stream:
+            tokens = ofxstream.tokenize(ofxstream.read_chunks(stream))
+            try:
+                text = next((text for tag, text in tokens if tag == 'DTEND'), '')
+            except ofxstream.Invalid:
+                return None
+        match = re.match(r'\d{8}', text)
+        return match and match.group(0)
+
 
 class Accounts(Base):
+    _registries: dict[path.Path, tuple] = {}
+
+    @classmethod
+    def registry(cls):
+        """
+        The accounts, parsed once and reused until the accounts file changes.
+        """
+        key = tuple(
+            file.stat().st_mtime if file.exists() else None
+            for file in (cls.root / 'accounts.yaml', cls.root / 'accounts.json')
+        )
+        cached_key, registry = cls._registries.get(cls.root, (None, None))
+        if cached_key != key:
+            docs = cls.load_accounts_yaml() or cls.load_accounts_json()
+            registry = Registry(map(Account.from_dict, docs))
+            cls._registries[cls.root] = key, registry
+        return registry
+
     @classmethod
     def load_accounts(cls):
-        docs = cls.load_accounts_yaml() or cls.load_accounts_json()
-        return list(map(Account, docs))
+        return list(cls.registry().accounts)
 
     @classmethod
     def load_accounts_yaml(cls):
@@ -402,7 +1149,8 @@ class Accounts(Base):
         Preferred mechanism for defining accounts.
         """
         accounts = cls.root / 'accounts.yaml'
-        if not accounts.exists() or 'yaml' not in globals():
+        yaml = _yaml()
+        if not accounts.exists() or yaml is None:
             return
         with accounts.open() as stream:
             return yaml.safe_load(stream)
@@ -417,22 +1165,21 @@ class Accounts(Base):
 
     @classmethod
     def best_account(cls, input):
-        return next(
-            account for account in cls.load_accounts() if input in account.institution
-        )
+        try:
+            return cls.registry().best(input)
+        except StopIteration:
+            raise ValueError(f"No account matching {input}") from None
 
     @classmethod
     def matching_accounts(cls, query):
-        return [account for account in cls.load_accounts() if account.matches(query)]
+        return cls.registry().matching(query)
 
 
 class DownloadAll(Accounts, Command):
     @classmethod
     def add_arguments(cls, parser):
-        default_start = datetime.datetime.now() - datetime.timedelta(days=31)
-        parser.add_argument(
-            '-d', '--start-date', default=default_start, action=DateAction
-        )
+        cls.add_start_arguments(parser)
+        cls.add_compress_argument(parser)
         parser.add_argument('-v', '--validate', default=False, action="store_true")
         parser.add_argument(
             '-l',
@@ -445,34 +1192,323 @@ class DownloadAll(Accounts, Command):
             '-k',
             '--like',
             help="Only download the accounts whose names are like the supplied string.",
-            default=cls.load_accounts(),
             type=cls.matching_accounts,
             dest='accounts',
         )
+        parser.add_argument(
+            '-j',
+            '--jobs',
+            type=int,
+            default=1,
+            help="Number of accounts to download concurrently.",
+        )
+        parser.add_argument(
+            '--per-institution',
+            type=int,
+            default=1,
+            help="Limit on concurrent downloads from any one institution.",
+        )
+        parser.add_argument(
+            '--async',
+            default=False,
+            action="store_true",
+            dest='use_async',
+            help="Download on an event loop (requires aiohttp), allowing "
+            "many more concurrent jobs than threads.",
+        )
+        parser.add_argument(
+            '-b',
+            '--batch',
+            default=False,
+            action="store_true",
+            help="Request the statements for all accounts at an institution "
+            "(with the same username) in a single request.",
+        )
+        parser.add_argument(
+            '--retries',
+            type=int,
+            default=3,
+            help="Retries (with backoff) for a download that fails transiently.",
+        )
+        parser.add_argument(
+            '--rate',
+            type=float,
+            help="Requests per second allowed to any one institution "
+            f"(default {scheduling.Scheduler.rate}) unless it sets its own rate.",
+        )
+        parser.add_argument(
+            '-i',
+            '--ingest',
+            default=False,
+            action="store_true",
+            help="Add the downloaded transactions to the store (see ingest).",
+        )
+        parser.add_argument(
+            '-n',
+            '--new-only',
+            default=False,
+            action="store_true",
+            help="Reduce each download to the transactions not in any "
+            "previous download with this option.",
+        )
 
     @classmethod
     def run(cls, args):
-        print(f'Matching {len(args.accounts)}/{len(cls.load_accounts())} accounts')
-        for account in args.accounts:
-            log.info('Downloading {institution} ({account})'.format(**account))
-            username = account.get('username', getpass.getuser())
-            site = account['institution']
-            creds = username, cls._get_password(site, username)
-            acct_type = account.get('type', '').upper() or None
-            dt_start = args.start_date.strftime("%Y%m%d")
-            ofx = cls.download(site, account['account'], dt_start, creds, acct_type)
-            if args.validate or args.launch:
-                cls.validate(ofx)
-            if args.launch:
+        accounts = cls.load_accounts()
+        if args.accounts is None:
+            args.accounts = accounts
+        print(f'Matching {len(args.accounts)}/{len(accounts)} accounts')
+        watermarks = Watermarks.load()
+        credentials = Credentials()
+        credentials.prefetch(
+            (account.institution, account.username) for account in args.accounts
+        )
+        downloads = [
+            cls._prepare(account, args, watermarks, credentials)
+            for account in args.accounts
+        ]
+        credentials.clear()
+        units = cls._units(downloads, args.batch)
+        scheduler = scheduling.Scheduler(
+            sites, args.rate, scheduling.Backoff(args.retries)
+        )
+        handle = functools.partial(
+            cls.handle_download,
+            args=args,
+            watermarks=watermarks,
+            store=cls.store() if args.ingest else None,
+            index=fitids.Index(cls.root / 'fitids.sqlite') if args.new_only else None,
+        )
+        if args.use_async:
+            import asyncio
+
+            failures = asyncio.run(
+                cls.run_async(downloads, units, args, handle, scheduler)
+            )
+            return cls.report(failures, len(downloads))
+        failures = []
+        with concurrent.futures.ThreadPoolExecutor(args.jobs) as executor:
+            futures = {}
+            submitted = cls._submit(executor, scheduler, units, args.per_institution)
+            for unit, future in submitted:
+                futures.update(dict.fromkeys(dict(unit), future))
+            # handle the results in the order the accounts were supplied
+            for index, download in enumerate(downloads):
+                try:
+                    ofx = futures[index].result()[index]
+                    handle(download, ofx)
+                except Exception as exc:
+                    failures.append((download, exc))
+        cls.report(failures, len(downloads))
+
+    @classmethod
+    def _prepare(cls, account, args, watermarks, credentials):
+        site = account.institution
+        creds = account.username, credentials.get(site, account.username)
+        acct_type = (account.type or '').upper() or None
+        dt_start = cls.start_date(args, watermarks, site, account.account)
+        # launching removes the file, so there's no archive to compress
+        compress = args.compress and not args.launch
+        return Download(site, account.account, dt_start, creds, acct_type, compress)
+
+    @staticmethod
+    def _units(downloads, batch):
+        """
+        Group the downloads into units of work, each a list of
+        (index, download). When batching, a unit is all of the
+        accounts at a site sharing credentials.
+        """
+        indexed = list(enumerate(downloads))
+        if not batch:
+            return [[item] for item in indexed]
+        groups = collections.defaultdict(list)
+        for index, download in indexed:
+            key = download.site, download.creds, download.compress
+            groups[key].append((index, download))
+        return list(groups.values())
+
+    @classmethod
+    def _submit(cls, executor, scheduler, units, per_institution):
+        """
+        Submit the units round-robin by institution, so the workers
+        aren't all held waiting on the limit for a single institution.
+        """
+        by_site = collections.defaultdict(list)
+        for unit in units:
+            by_site[unit[0][1].site].append(unit)
+        limits = {site: threading.BoundedSemaphore(per_institution) for site in by_site}
+        for unit in more_itertools.interleave_longest(*by_site.values()):
+            limit = limits[unit[0][1].site]
+            yield unit, executor.submit(cls._download, scheduler, limit, unit)
+
+    @classmethod
+    def _download(cls, scheduler, limit, unit):
+        indexes, downloads = zip(*unit)
+        with limit, metrics.account(cls._unit_label(downloads)):
+            cls._log_unit(downloads)
+            names = scheduler.call(downloads[0].site, cls._fetch, downloads)
+        return dict(zip(indexes, names))
+
+    @classmethod
+    def _fetch(cls, downloads):
+        if len(downloads) > 1:
+            return cls.download_batch(downloads)
+        return [cls.download(*downloads[0])]
+
+    @classmethod
+    async def _fetch_async(cls, session, downloads):
+        if len(downloads) > 1:
+            return await cls.download_batch_async(session, downloads)
+        return [await cls.download_async(session, *downloads[0])]
+
+    @staticmethod
+    def _unit_label(downloads):
+        accounts = ','.join(download.account for download in downloads)
+        return f'{downloads[0].site} {accounts}'
+
+    @staticmethod
+    def _log_unit(downloads):
+        accounts = ', '.join(download.account for download in downloads)
+        log.info(f'Downloading {downloads[0].site} ({accounts})')
+
+    @classmethod
+    async def run_async(cls, downloads, units, args, handle, scheduler):
+        """
+        Download the units on an event loop, handling each result
+        and returning the failures.
+        """
+        import asyncio
+
+        import aiohttp
+
+        limit = asyncio.Semaphore(args.jobs)
+        limits = collections.defaultdict(
+            lambda: asyncio.Semaphore(args.per_institution)
+        )
+
+        async def download(session, unit):
+            indexes, downloads = zip(*unit)
+            # wait on the institution before occupying a job
+            label = cls._unit_label(downloads)
+            async with limits[downloads[0].site], limit:
+                with metrics.account(label):
+                    cls._log_unit(downloads)
+                    names = await scheduler.call_async(
+                        downloads[0].site, cls._fetch_async, session, downloads
+                    )
+            return dict(zip(indexes, names))
+
+        connector = aiohttp.TCPConnector(limit=args.jobs)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            tasks = {}
+            for unit in units:
+                task = asyncio.ensure_future(download(session, unit))
+                tasks.update(dict.fromkeys(dict(unit), task))
+            failures = []
+            # handle the results in the order the accounts were supplied
+            for index, item in enumerate(downloads):
+                try:
+                    ofx = (await tasks[index])[index]
+                    await asyncio.to_thread(handle, item, ofx)
+                except Exception as exc:
+                    failures.append((item, exc))
+            return failures
+
+    @staticmethod
+    def report(failures, total):
+        """
+        Report the downloads that failed, exiting with an error if any did.
+        """
+        for download, exc in failures:
+            log.error(f'{download.site} {download.account} failed: {exc}')
+        if failures:
+            raise SystemExit(f'{len(failures)} of {total} downloads failed')
+
+    @classmethod
+    def handle_download(cls, download, ofx, args, watermarks, store=None, index=None):
+        account = f'{download.site} {download.account}'
+        with metrics.account(account):
+            cls._handle_download(download, ofx, args, watermarks, store, index)
+
+    @classmethod
+    def _handle_download(cls, download, ofx, args, watermarks, store, index):
+        account = f'{download.site} {download.account}'
+        if index is not None:
+            with metrics.phase('strip'):
+                kept = cls.strip_seen(ofx, account, index)
+        if args.validate or args.launch:
+            cls.validate(ofx)
+        watermarks.record(download.site, download.account, ofx)
+        if store is not None:
+            with metrics.phase('ingest'):
+                store.ingest(ofx)
+        if args.launch:
+            with metrics.phase('import'):
                 msmoney.launch(ofx)
-                ofx.remove()
+            ofx.remove()
+        if index is not None:
+            index.add(account, kept)
+
+    @staticmethod
+    def strip_seen(ofx, account, index):
+        """
+        Reduce the OFX file to the transactions not previously seen
+        for the account, returning the FITIDs of those that remain.
+        """
+        with open_ofx(ofx) as stream:
+            content = stream.read()
+        content, kept = fitids.strip_seen(content, lambda id: (account, id) in index)
+        with replacing(ofx) as out:
+            out.write(content)
+        log.info(f'{account}: {len(kept)} new transactions')
+        return kept
 
     @classmethod
     def validate(cls, ofx_file):
-        parser = ofxparse.OfxParser()
-        with open(ofx_file, 'rb') as reader:
-            doc = parser.parse(reader)
-        assert doc.account.statement
+        with metrics.phase('validate') as sample:
+            ofxstream.validate_file(ofx_file)
+            sample.bytes = os.path.getsize(ofx_file)
+
+
+class Validate(Command):
+    """
+    Check that each of the OFX files is a successful statement response.
+    """
+
+    @classmethod
+    def add_arguments(cls, parser):
+        parser.add_argument('files', nargs='+', type=path.Path)
+        parser.add_argument(
+            '-j',
+            '--jobs',
+            type=int,
+            help="Number of processes validating files (default one per CPU).",
+        )
+
+    @classmethod
+    def run(cls, args):
+        results = ofxstream.validate_all(args.files, args.jobs)
+        failures = [(name, error) for name, error in results if error]
+        for name, error in failures:
+            print(f'{name}: {error}')
+        if failures:
+            raise SystemExit(f'{len(failures)} of {len(args.files)} files are invalid')
+
+
+class Ingest(Base, Command):
+    """
+    Add the transactions in the OFX files to the store.
+    """
+
+    @classmethod
+    def add_arguments(cls, parser):
+        parser.add_argument('files', nargs='+', type=path.Path)
+
+    @classmethod
+    def run(cls, args):
+        store = cls.store()
+        for file in args.files:
+            print(f'{file}: {store.ingest(file)} transactions')
 
 
 class ListInstitutions(Command):
@@ -492,6 +1528,8 @@ class UpdatePassword(Accounts, Command):
         new_password = getpass.getpass(prompt)
         if not new_password:
             return
+        import keyring
+
         keyring.set_password(
             args.account.institution, args.account.username, new_password
         )
@@ -504,6 +1542,29 @@ def get_args():
     usage = inspect.getdoc(handle_command_line)
     parser = argparse.ArgumentParser(usage=usage)
     jaraco.logging.add_arguments(parser)
+    cassette = parser.add_mutually_exclusive_group()
+    cassette.add_argument(
+        '--record',
+        metavar='DIR',
+        dest='cassette',
+        type=functools.partial(cassettes.Cassette, mode='record'),
+        help="Record the exchanges with institutions to DIR.",
+    )
+    cassette.add_argument(
+        '--replay',
+        metavar='DIR',
+        dest='cassette',
+        type=functools.partial(cassettes.Cassette, mode='replay'),
+        help="Replay the exchanges recorded in DIR instead of contacting "
+        "the institutions.",
+    )
+    parser.add_argument(
+        '--metrics',
+        metavar='FILE',
+        help="Save the timings of each phase for each account to FILE, "
+        "in the Prometheus text format if it ends with .prom, else as "
+        "JSON lines.",
+    )
     Command.add_subparsers(parser)
     return parser.parse_args()
 
@@ -514,15 +1575,25 @@ def setup_requests_logging(level):
     requests_log.propagate = True
 
     # enable debugging at httplib level
-    HTTPConnection.debuglevel = level <= logging.DEBUG
+    if level <= logging.DEBUG:
+        from urllib3.connectionpool import HTTPConnection
+
+        HTTPConnection.debuglevel = True
 
 
 def handle_command_line():
     args = get_args()
     jaraco.logging.setup(args, format="%(message)s")
     setup_requests_logging(args.log_level)
-    load_sites()
-    args.action.run(args)
+    OFXClient.pool.cassette = args.cassette
+    recorder = metrics.enable() if args.metrics else None
+    try:
+        with contextlib.closing(OFXClient.pool):
+            args.action.run(args)
+    finally:
+        if recorder is not None:
+            recorder.save(args.metrics)
+            metrics.disable()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,425 @@
+r"""
+Incremental reading of OFX documents, both 1.x (SGML) and 2.x (XML),
+without building a tree of the whole document.
+
+>>> doc = [
+...     b'OFXHEADER:100\r\nDATA:OFXSGML\r\nVERSION:102\r\n\r\n<OFX><SIGNONMSGSRSV1>',
+...     b'<SONRS><STATUS><CODE>0<SEVERITY>INFO</STATUS></SONRS></SIGNONMSGSRSV1>',
+...     b'<CREDITCARDMSGSRSV1><CCSTMTTRNRS><TRNUID>1<STATUS><CODE>0',
+...     b'<SEVERITY>INFO</STATUS><CCSTMTRS><CURDEF>USD</CCSTMTRS>',
+...     b'</CCSTMTTRNRS></CREDITCARDMSGSRSV1></OFX>',
+... ]
+>>> validate(doc)
+>>> validate(doc[:2])
+Traceback (most recent call last):
+...
+jaraco.financial.ofxstream.Invalid: No statement found
+>>> failed = [chunk.replace(b'0<SEV', b'2000<SEVERITY>ERROR<X') for chunk in doc]
+>>> validate(failed)
+Traceback (most recent call last):
+...
+jaraco.financial.ofxstream.Invalid: SONRS failed with code 2000
+"""
+
+from __future__ import annotations
+
+import codecs
+import concurrent.futures
+import datetime
+import decimal
+import functools
+import gzip
+import html
+import itertools
+import re
+import typing
+
+chunk_size = 64 * 1024
+
+STATEMENTS = {'STMTRS', 'CCSTMTRS', 'INVSTMTRS'}
+
+INVESTMENT_TRANSACTIONS = {
+    'BUYDEBT',
+    'BUYMF',
+    'BUYOPT',
+    'BUYOTHER',
+    'BUYSTOCK',
+    'CLOSUREOPT',
+    'INCOME',
+    'INVEXPENSE',
+    'JRNLFUND',
+    'JRNLSEC',
+    'MARGININTEREST',
+    'REINVEST',
+    'RETOFCAP',
+    'SELLDEBT',
+    'SELLMF',
+    'SELLOPT',
+    'SELLOTHER',
+    'SELLSTOCK',
+    'SPLIT',
+    'TRANSFER',
+}
+
+POSITIONS = {'POSDEBT', 'POSMF', 'POSOPT', 'POSOTHER', 'POSSTOCK'}
+
+SECURITIES = {'DEBTINFO', 'MFINFO', 'OPTINFO', 'OTHERINFO', 'STOCKINFO'}
+
+
+class Invalid(ValueError):
+    """
+    The document is not a valid (or successful) OFX response.
+    """
+
+
+def open_ofx(name):
+    """
+    Open the OFX file for binary reading, decompressing if it ends with '.gz'.
+    """
+    return gzip.open(name) if str(name).endswith('.gz') else open(name, 'rb')
+
+
+def read_chunks(stream, size=chunk_size):
+    return iter(functools.partial(stream.read, size), b'')
+
+
+def header_encoding(head):
+    r"""
+    Return the encoding declared by the OFX header at the start of head.
+
+    >>> header_encoding(b'OFXHEADER:100\r\nENCODING:USASCII\r\nCHARSET:1252\r\n')
+    'cp1252'
+    >>> header_encoding(b'<?xml version="1.0"?><?OFX OFXHEADER="200"?><OFX>')
+    'utf-8'
+    >>> header_encoding(b'<html>')
+    Traceback (most recent call last):
+    ...
+    jaraco.financial.ofxstream.Invalid: Missing OFX header
+    """
+    head = head.lstrip()
+    if head.startswith(b'OFXHEADER:'):
+        header = head.partition(b'<')[0]
+        return 'utf-8' if re.search(rb'ENCODING:\s*UTF-8', header) else 'cp1252'
+    if head.startswith(b'<?xml') and b'<?OFX' in head:
+        declared = re.match(rb'<\?xml[^>]*encoding="([^"]+)"', head)
+        return declared.group(1).decode('ascii') if declared else 'utf-8'
+    raise Invalid('Missing OFX header')
+
+
+_tag_pattern = re.compile(r'<([^>]*)>([^<]*)')
+
+
+def _scan(text):
+    for match in _tag_pattern.finditer(text):
+        tag, value = match.groups()
+        if tag[:1] in '?!':
+            continue
+        value = value.strip()
+        if '&' in value:
+            value = html.unescape(value)
+        if tag.endswith('/'):
+            yield tag[:-1], ''
+            yield '/' + tag[:-1], ''
+            continue
+        yield tag, value
+
+
+def tokenize(chunks):
+    r"""
+    Yield (tag, text) for each tag in the OFX document supplied as
+    chunks of bytes, where text is the content following the tag
+    (up to the next tag). End tags are yielded as '/TAG'.
+
+    >>> doc = [b'OFXHEADER:100\r\n\r\n<OFX><STATUS><CODE>0<MESS', b'AGE>A &amp; B']
+    >>> list(tokenize(doc + [b'</STATUS></OFX>']))
+    [('OFX', ''), ('STATUS', ''), ('CODE', '0'), ('MESSAGE', 'A & B'), ...]
+    """
+    chunks = iter(chunks)
+    head = next(chunks, b'')
+    decoder = codecs.getincrementaldecoder(header_encoding(head))(errors='replace')
+    buffer = ''
+    for chunk in itertools.chain([head], chunks):
+        buffer += decoder.decode(chunk)
+        # only scan up to the last tag, which may not be complete
+        end = buffer.rfind('<')
+        if end > 0:
+            yield from _scan(buffer[:end])
+            buffer = buffer[end:]
+    yield from _scan(buffer + decoder.decode(b'', final=True))
+
+
+def _check_status(context, status):
+    code = status.get('CODE')
+    default = 'INFO' if code == '0' else 'ERROR'
+    if status.get('SEVERITY', default) != 'ERROR':
+        return
+    message = f'{context} failed with code {code}'
+    if 'MESSAGE' in status:
+        message += f': {status["MESSAGE"]}'
+    raise Invalid(message)
+
+
+def validate(chunks):
+    r"""
+    Check that the OFX document supplied as chunks of bytes has a
+    header, that the signon and any transactions succeeded, that it
+    contains a statement and that it ends. Tokenizing stops at the
+    first statement; the rest is only searched for the closing tag,
+    so a truncated document fails.
+
+    >>> doc = [
+    ...     b'OFXHEADER:100\r\n\r\n<OFX><SONRS><STATUS><CODE>0</STATUS></SONRS>',
+    ...     b'<CCSTMTRS><BANKTRANLIST><STMTTRN><TRNAMT>-5.00</STMTTRN>\r\n',
+    ...     b'<STMTTRN><TRNAMT>-3.00</STMTTRN></BANKTRANLIST></CCSTMTRS></OFX>\r\n',
+    ... ]
+    >>> validate(doc)
+    >>> validate(doc[:2])
+    Traceback (most recent call last):
+    ...
+    jaraco.financial.ofxstream.Invalid: Truncated document (no </OFX>)
+    """
+    tail = b''
+
+    def track(chunks):
+        nonlocal tail
+        for chunk in chunks:
+            tail = (tail + chunk)[-1024:]
+            yield chunk
+
+    raw = track(chunks)
+    _validate_tokens(tokenize(raw))
+    for _ in raw:
+        pass
+    if b'</OFX>' not in tail:
+        raise Invalid('Truncated document (no </OFX>)')
+
+
+def _validate_tokens(tokens, signon_only=False):
+    """
+    Check the statuses up to the first statement (or if signon_only,
+    up to the signon status).
+    """
+    signed_on = False
+    context = status = None
+    for tag, text in tokens:
+        if tag == 'SONRS' or tag.endswith('TRNRS'):
+            context = tag
+        elif tag == 'STATUS':
+            status = {}
+        elif tag == '/STATUS':
+            _check_status(context, status)
+            signed_on |= context == 'SONRS'
+            status = None
+            if signed_on and signon_only:
+                return
+        elif status is not None:
+            status[tag] = text
+        elif tag in STATEMENTS:
+            if not signed_on:
+                raise Invalid('No signon response')
+            return
+    raise Invalid('No signon response' if signon_only else 'No statement found')
+
+
+def check_signon(chunks):
+    r"""
+    Check that the OFX document supplied as chunks of bytes has a
+    header and a successful signon, reading only as far as the
+    signon status.
+
+    >>> check_signon([b'OFXHEADER:100\r\n\r\n<OFX><SONRS><STATUS><CODE>0</STATUS>'])
+    >>> check_signon([
+    ...     b'OFXHEADER:100\r\n\r\n<OFX><SONRS><STATUS><CODE>15500'
+    ...     b'<SEVERITY>ERROR<MESSAGE>Bad password</STATUS>'
+    ... ])
+    Traceback (most recent call last):
+    ...
+    jaraco.financial.ofxstream.Invalid: SONRS failed with code 15500: Bad password
+    """
+    _validate_tokens(tokenize(chunks), signon_only=True)
+
+
+def validate_file(name):
+    with open_ofx(name) as stream:
+        validate(read_chunks(stream))
+
+
+def _check(name):
+    try:
+        validate_file(name)
+    except (Invalid, OSError, EOFError) as exc:
+        return exc
+
+
+def validate_all(names, jobs=None):
+    """
+    Validate the files across a pool of (up to jobs) processes,
+    yielding (name, error) for each, where error is None if the
+    file is valid.
+    """
+    names = list(names)
+    with concurrent.futures.ProcessPoolExecutor(jobs) as executor:
+        yield from zip(names, executor.map(_check, names, chunksize=4))
+
+
+class Transaction(typing.NamedTuple):
+    account: str | None
+    type: str | None
+    posted: datetime.date | None
+    amount: decimal.Decimal | None
+    fitid: str | None
+    name: str | None
+    memo: str | None
+
+
+class InvestmentTransaction(typing.NamedTuple):
+    account: str | None
+    type: str
+    traded: datetime.date | None
+    fitid: str | None
+    security: str | None
+    units: decimal.Decimal | None
+    unit_price: decimal.Decimal | None
+    total: decimal.Decimal | None
+    memo: str | None
+
+
+class Position(typing.NamedTuple):
+    account: str | None
+    type: str
+    security: str | None
+    units: decimal.Decimal | None
+    unit_price: decimal.Decimal | None
+    market_value: decimal.Decimal | None
+    priced: datetime.date | None
+
+
+class Security(typing.NamedTuple):
+    type: str
+    security: str | None
+    name: str | None
+    ticker: str | None
+
+
+def _date(value):
+    if not value:
+        return None
+    return datetime.date(int(value[:4]), int(value[4:6]), int(value[6:8]))
+
+
+def _decimal(value):
+    return decimal.Decimal(value.replace(',', '.')) if value else None
+
+
+def _transaction(tag, fields, account):
+    return Transaction(
+        account,
+        fields.get('TRNTYPE'),
+        _date(fields.get('DTPOSTED')),
+        _decimal(fields.get('TRNAMT')),
+        fields.get('FITID'),
+        fields.get('NAME'),
+        fields.get('MEMO'),
+    )
+
+
+def _investment(tag, fields, account):
+    return InvestmentTransaction(
+        account,
+        tag,
+        _date(fields.get('DTTRADE')),
+        fields.get('FITID'),
+        fields.get('UNIQUEID'),
+        _decimal(fields.get('UNITS')),
+        _decimal(fields.get('UNITPRICE')),
+        _decimal(fields.get('TOTAL')),
+        fields.get('MEMO'),
+    )
+
+
+def _position(tag, fields, account):
+    return Position(
+        account,
+        tag,
+        fields.get('UNIQUEID'),
+        _decimal(fields.get('UNITS')),
+        _decimal(fields.get('UNITPRICE')),
+        _decimal(fields.get('MKTVAL')),
+        _date(fields.get('DTPRICEASOF')),
+    )
+
+
+def _security(tag, fields, account):
+    return Security(
+        tag, fields.get('UNIQUEID'), fields.get('SECNAME'), fields.get('TICKER')
+    )
+
+
+_builders = {
+    'STMTTRN': _transaction,
+    **dict.fromkeys(INVESTMENT_TRANSACTIONS, _investment),
+    **dict.fromkeys(POSITIONS, _position),
+    **dict.fromkeys(SECURITIES, _security),
+}
+
+
+def records(chunks):
+    r"""
+    Yield a record for each transaction, position and security in the
+    OFX document supplied as chunks of bytes, in document order.
+    Transactions and positions carry the account of their statement.
+
+    >>> doc = [
+    ...     b'OFXHEADER:100\r\n\r\n<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS>',
+    ...     b'<BANKACCTFROM><ACCTID>12</BANKACCTFROM><BANKTRANLIST>',
+    ...     b'<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20261002120000<TRNAMT>-5.00',
+    ...     b'<FITID>1<NAME>Coffee &amp; Co<MEMO></STMTTRN></BANKTRANLIST>',
+    ...     b'</STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>',
+    ... ]
+    >>> txn = next(records(doc))
+    >>> txn.account, txn.posted, txn.amount, txn.name, txn.memo
+    ('12', datetime.date(2026, 10, 2), Decimal('-5.00'), 'Coffee & Co', None)
+
+    2.x documents close every element.
+
+    >>> doc = [
+    ...     b'<?xml version="1.0"?><?OFX OFXHEADER="200"?><OFX>',
+    ...     b'<SECLISTMSGSRSV1><SECLIST><MFINFO><SECINFO><SECID>',
+    ...     b'<UNIQUEID>123</UNIQUEID><UNIQUEIDTYPE>CUSIP</UNIQUEIDTYPE>',
+    ...     b'</SECID><SECNAME>Fund</SECNAME></SECINFO></MFINFO>',
+    ...     b'</SECLIST></SECLISTMSGSRSV1></OFX>',
+    ... ]
+    >>> list(records(doc))
+    [Security(type='MFINFO', security='123', name='Fund', ticker=None)]
+    """
+    stack = []
+    account = record = fields = None
+    depth = 0
+    for tag, text in tokenize(chunks):
+        if tag[0] == '/':
+            name = tag[1:]
+            # closing a leaf element (2.x) or an unknown aggregate
+            if name not in stack:
+                continue
+            while stack.pop() != name:
+                pass
+            if record and len(stack) < depth:
+                yield _builders[record](record, fields, account)
+                record = fields = None
+        elif text:
+            if fields is not None:
+                fields.setdefault(tag, text)
+            elif tag == 'ACCTID':
+                account = text
+        else:
+            stack.append(tag)
+            if record is None and tag in _builders:
+                record, depth, fields = tag, len(stack), {}
+
+
+def read_records(name):
+    """
+    Yield the records in the OFX file.
+    """
+    with open_ofx(name) as stream:
+        yield from records(read_chunks(stream))
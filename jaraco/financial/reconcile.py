@@ -0,0 +1,131 @@
+"""
+Reconcile the transactions entered by hand against those downloaded
+from the bank.
+
+Transactions match on the amount and on dates within a window of
+days of each other (as the bank may post a few days after the
+transaction was entered). Where several manual transactions could
+match a download, the one to the same payee wins; failing that, the
+download is ambiguous and left for review.
+
+The manual transactions are bucketed by amount (in cents) and each
+bucket kept in date order, so each download is matched by a lookup
+and a bisection rather than a scan.
+
+>>> from datetime import date
+>>> from jaraco.financial.ledger import Transaction, SimpleDesignation
+>>> def txn(day, payee, amount, source):
+...     return Transaction(
+...         date=date(2026, 10, day),
+...         payee=payee,
+...         designation=SimpleDesignation('', amount),
+...         source=source,
+...     )
+>>> manual = [
+...     txn(1, 'Grocer', -45, 'manual'),
+...     txn(3, 'Cafe', -5, 'manual'),
+...     txn(3, 'Bakery', -5, 'manual'),
+...     txn(9, 'Landlord', -900, 'manual'),
+... ]
+>>> downloaded = [
+...     txn(3, 'GROCER #12', -45, 'bank download'),
+...     txn(4, 'Cafe', -5, 'bank download'),
+...     txn(9, 'Cinema', -5, 'bank download'),
+...     txn(6, 'Employer', 2000, 'bank download'),
+... ]
+>>> result = reconcile(manual, downloaded)
+>>> [(found.payee, expected.payee) for found, expected in result.matched]
+[('GROCER #12', 'Grocer'), ('Cafe', 'Cafe')]
+>>> [(found.payee, len(candidates)) for found, candidates in result.ambiguous]
+[]
+>>> [txn.payee for txn in result.downloaded]
+['Employer', 'Cinema']
+>>> [txn.payee for txn in result.manual]
+['Bakery', 'Landlord']
+
+With two candidates and no payee to tell them apart, the download
+is ambiguous, and the candidates are left for review with it rather
+than listed as unmatched.
+
+>>> result = reconcile(manual, [txn(2, 'Cinema', -5, 'bank download')])
+>>> [(found.payee, len(candidates)) for found, candidates in result.ambiguous]
+[('Cinema', 2)]
+>>> [txn.payee for txn in result.manual]
+['Grocer', 'Landlord']
+
+A transaction without a designation has an amount of zero.
+
+>>> memo = Transaction(date=date(2026, 10, 5), payee='Memo')
+>>> result = reconcile([memo], [txn(5, 'Memo', 0, 'bank download')])
+>>> [(found.payee, expected.payee) for found, expected in result.matched]
+[('Memo', 'Memo')]
+"""
+
+from __future__ import annotations
+
+import bisect
+import collections
+import itertools
+import operator
+from typing import NamedTuple
+
+from . import ledger
+
+
+class Reconciliation(NamedTuple):
+    matched: list
+    "(downloaded, manual) pairs of matching transactions"
+    ambiguous: list
+    "(downloaded, candidates) for downloads matching several manual transactions"
+    downloaded: list
+    "Downloaded transactions matching no manual transaction"
+    manual: list
+    "Manual transactions matched by no download (nor candidates for one)"
+
+
+def _bucket(transactions):
+    """
+    Index the transactions by amount (in cents), each bucket holding
+    (day, sequence, transaction) in date order.
+    """
+    buckets = collections.defaultdict(list)
+    for seq, txn in enumerate(transactions):
+        buckets[ledger._cents(txn.amount)].append((txn.date.toordinal(), seq, txn))
+    for bucket in buckets.values():
+        bucket.sort(key=lambda entry: entry[:2])
+    return buckets
+
+
+def reconcile(manual, downloaded, days=3):
+    """
+    Match each downloaded transaction (in date order) to a manual
+    transaction of the same amount dated within days of it.
+    """
+    buckets = _bucket(manual)
+    result = Reconciliation([], [], [], [])
+    # sequences of the candidates for ambiguous downloads
+    candidates = set()
+    for txn in sorted(downloaded, key=lambda txn: txn.date.toordinal()):
+        bucket = buckets.get(ledger._cents(txn.amount), [])
+        day = txn.date.toordinal()
+        start = bisect.bisect_left(bucket, (day - days,))
+        stop = bisect.bisect_left(bucket, (day + days + 1,))
+        window = range(start, stop)
+        if len(window) > 1:
+            window = [
+                index for index in window if bucket[index][2].payee == txn.payee
+            ] or window
+        if not window:
+            result.downloaded.append(txn)
+        elif len(window) > 1:
+            result.ambiguous.append((txn, [bucket[index][2] for index in window]))
+            candidates.update(bucket[index][1] for index in window)
+        else:
+            (index,) = window
+            result.matched.append((txn, bucket.pop(index)[2]))
+    remaining = itertools.chain.from_iterable(buckets.values())
+    by_seq = operator.itemgetter(1)
+    result.manual.extend(
+        txn for day, seq, txn in sorted(remaining, key=by_seq) if seq not in candidates
+    )
+    return result
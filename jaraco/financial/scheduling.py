@@ -0,0 +1,193 @@
+"""
+Scheduling of the requests to institutions: a rate limit for each
+institution and retries (with backoff) on transient failures.
+"""
+
+from __future__ import annotations
+
+import logging
+import random
+import sys
+import threading
+import time
+import typing
+
+log = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Admit ``rate`` requests per second, with bursts of up to ``burst``.
+
+    :meth:`reserve` takes a token and returns the seconds to wait
+    before using it, so the same bucket serves threads and tasks alike.
+
+    >>> bucket = TokenBucket(rate=1, burst=2)
+    >>> [round(bucket.reserve()) for _ in range(4)]
+    [0, 0, 1, 2]
+
+    A bucket without a rate admits everything.
+
+    >>> TokenBucket(rate=None).reserve()
+    0
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        if not self.rate:
+            return 0
+        with self._lock:
+            now = time.monotonic()
+            elapsed, self.stamp = now - self.stamp, now
+            self.tokens = min(self.burst, self.tokens + elapsed * self.rate) - 1
+            return max(0, -self.tokens / self.rate)
+
+
+class Backoff(typing.NamedTuple):
+    """
+    Exponential backoff with full jitter.
+
+    >>> delays = list(Backoff(retries=3, base=1, cap=3).delays())
+    >>> len(delays)
+    3
+    >>> all(0 <= delay <= limit for delay, limit in zip(delays, [1, 2, 3]))
+    True
+    """
+
+    retries: int = 3
+    base: float = 1.0
+    cap: float = 30.0
+
+    def delays(self):
+        for attempt in range(self.retries):
+            yield random.uniform(0, min(self.cap, self.base * 2**attempt))
+
+
+def _status(exc):
+    response = getattr(exc, 'response', None)
+    return getattr(exc, 'status', None) or getattr(response, 'status_code', None)
+
+
+def _error_types():
+    """
+    The transient errors, and the errors among them that are not.
+    Errors from requests, aiohttp or asyncio can only occur if the
+    module was imported.
+    """
+    transient = [ConnectionError, TimeoutError]
+    permanent = []
+    modules = sys.modules
+    if 'asyncio' in modules:
+        # distinct from the builtin TimeoutError before Python 3.11
+        transient.append(modules['asyncio'].TimeoutError)
+    if 'requests' in modules:
+        requests = modules['requests']
+        transient += [requests.ConnectionError, requests.Timeout]
+        permanent.append(requests.exceptions.SSLError)
+    if 'aiohttp' in modules:
+        aiohttp = modules['aiohttp']
+        transient.append(aiohttp.ClientConnectionError)
+        permanent.append(aiohttp.ClientSSLError)
+    return tuple(transient), tuple(permanent)
+
+
+def is_transient(exc):
+    """
+    Is the error one that may succeed on retry?
+
+    >>> is_transient(TimeoutError())
+    True
+    >>> is_transient(ValueError()), is_transient(PermissionError())
+    (False, False)
+    >>> import requests
+    >>> is_transient(requests.ConnectionError()), is_transient(requests.ReadTimeout())
+    (True, True)
+    >>> is_transient(requests.exceptions.SSLError())
+    False
+    >>> is_transient(requests.exceptions.InvalidURL())
+    False
+    >>> class HTTPError(OSError):
+    ...     def __init__(self, status):
+    ...         self.status = status
+    >>> is_transient(HTTPError(503)), is_transient(HTTPError(429))
+    (True, True)
+    >>> is_transient(HTTPError(404))
+    False
+    """
+    status = _status(exc)
+    if status is not None:
+        return status in (408, 429) or status >= 500
+    transient, permanent = _error_types()
+    return isinstance(exc, transient) and not isinstance(exc, permanent)
+
+
+class Scheduler:
+    """
+    Run requests to institutions, each subject to the rate limit
+    for its institution and retried with backoff on transient
+    failure.
+
+    ``configs`` maps each site to its config, which may set ``rate``
+    (requests per second) and ``burst`` to override the defaults.
+    """
+
+    rate = 1.0
+    burst = 2
+
+    def __init__(self, configs, rate=None, backoff=None):
+        self.configs = configs
+        self.rate = rate or self.rate
+        self.backoff = backoff or Backoff()
+        self.buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, site):
+        with self._lock:
+            if site not in self.buckets:
+                config = self.configs.get(site, {})
+                self.buckets[site] = TokenBucket(
+                    config.get('rate', self.rate), config.get('burst', self.burst)
+                )
+            return self.buckets[site]
+
+    def _retry_delay(self, site, exc, delays):
+        """
+        Return the delay before retrying after exc, or None if it
+        should not be retried.
+        """
+        delay = next(delays, None) if is_transient(exc) else None
+        if delay is not None:
+            log.warning(f'{site}: {exc}; retrying in {delay:.1f}s')
+        return delay
+
+    def call(self, site, func, *args):
+        delays = self.backoff.delays()
+        while True:
+            time.sleep(self.bucket(site).reserve())
+            try:
+                return func(*args)
+            except Exception as exc:
+                delay = self._retry_delay(site, exc, delays)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+
+    async def call_async(self, site, func, *args):
+        import asyncio
+
+        delays = self.backoff.delays()
+        while True:
+            await asyncio.sleep(self.bucket(site).reserve())
+            try:
+                return await func(*args)
+            except Exception as exc:
+                delay = self._retry_delay(site, exc, delays)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
@@ -0,0 +1,140 @@
+"""
+HTTP sessions pooled per institution.
+"""
+
+from __future__ import annotations
+
+import collections
+import functools
+import logging
+import threading
+
+from . import cassettes
+
+log = logging.getLogger(__name__)
+
+
+class Stats(collections.Counter):
+    """
+    Counts of the requests made, the connections opened and the TLS
+    handshakes (the connections opened to https URLs) for a session.
+    Any request not opening a connection reused a warm one.
+
+    >>> stats = Stats(requests=5, connections=2, handshakes=1)
+    >>> stats.reused
+    3
+    >>> str(stats)
+    '5 requests over 2 connections (3 reused, 1 TLS handshakes)'
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock = threading.Lock()
+
+    def incr(self, key):
+        with self._lock:
+            self[key] += 1
+
+    @property
+    def reused(self):
+        return self['requests'] - self['connections']
+
+    def __str__(self):
+        return (
+            f'{self["requests"]} requests over {self["connections"]} connections '
+            f'({self.reused} reused, {self["handshakes"]} TLS handshakes)'
+        )
+
+
+def _counting(pool_cls, stats, scheme):
+    """
+    Subclass the connection pool class such that each connection
+    counts its connects in stats (and for https, its handshakes).
+    """
+
+    class Connection(pool_cls.ConnectionCls):
+        def connect(self):
+            stats.incr('connections')
+            if scheme == 'https':
+                stats.incr('handshakes')
+            super().connect()
+
+    return type(pool_cls.__name__, (pool_cls,), dict(ConnectionCls=Connection))
+
+
+@functools.lru_cache
+def _adapter_class():
+    """
+    Define the adapter class on demand, deferring the import of requests.
+    """
+    import requests.adapters
+
+    class Adapter(requests.adapters.HTTPAdapter):
+        """
+        An HTTPAdapter that keeps :class:`Stats` on its connections.
+        """
+
+        def __init__(self, *args, **kwargs):
+            self.stats = Stats()
+            super().__init__(*args, **kwargs)
+
+        def init_poolmanager(self, *args, **kwargs):
+            super().init_poolmanager(*args, **kwargs)
+            classes = self.poolmanager.pool_classes_by_scheme
+            self.poolmanager.pool_classes_by_scheme = {
+                scheme: _counting(pool_cls, self.stats, scheme)
+                for scheme, pool_cls in classes.items()
+            }
+
+        def send(self, *args, **kwargs):
+            self.stats.incr('requests')
+            return super().send(*args, **kwargs)
+
+    return Adapter
+
+
+class Pool(dict):
+    """
+    A session per institution URL, each with a connection pool sized
+    by the institution's ``pool_size`` (or the default).
+    """
+
+    pool_size = 4
+
+    cassette = None
+    "A :class:`cassettes.Cassette` to record or replay the exchanges."
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def get_session(self, config):
+        url = config['url']
+        with self._lock:
+            if url not in self:
+                self[url] = self._make_session(config.get('pool_size', self.pool_size))
+            return self[url]
+
+    def _make_session(self, pool_size):
+        import requests
+
+        session = requests.Session()
+        adapter = _adapter_class()(pool_connections=1, pool_maxsize=pool_size)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        if self.cassette:
+            cassettes.mount(self.cassette, session)
+        return session
+
+    def stats(self):
+        return {url: session.get_adapter(url).stats for url, session in self.items()}
+
+    def close(self):
+        """
+        Report the connection reuse for each session and close them.
+        """
+        with self._lock:
+            for url, stats in self.stats().items():
+                log.info(f'{url}: {stats}')
+            for session in self.values():
+                session.close()
+            self.clear()
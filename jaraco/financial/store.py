@@ -0,0 +1,278 @@
+"""
+A columnar store of the transactions ingested from OFX files.
+
+Each column is a file of fixed-width values, appended with
+:mod:`array` and read (by :meth:`Store.columns`) as NumPy
+memory maps, so scans over years of transactions are vectorized
+operations over the mapped files. Text (accounts, payees, memos
+and transaction types) is kept once in a string pool and referenced
+from the columns by index.
+
+>>> store = Store(getfixture('tmp_path'))
+>>> from datetime import date
+>>> store.append([
+...     ('1234', date(2026, 10, 1), -500, 'Coffee', '', 'DEBIT'),
+...     ('1234', date(2026, 10, 2), 10000, 'Employer', 'Pay', 'CREDIT'),
+...     ('5678', date(2026, 10, 3), -1250, 'Coffee', '', 'DEBIT'),
+... ])
+3
+>>> len(store)
+3
+>>> store.balance('1234')
+9500
+>>> store.balance(start=date(2026, 10, 2))
+8750
+>>> store.totals('payee')
+{'Coffee': -1750, 'Employer': 10000}
+"""
+
+from __future__ import annotations
+
+import array
+import collections
+import json
+import os
+
+import path
+
+from . import fitids, ofxstream
+
+# typecodes of the columns (see :mod:`array`), with 'i' for 32-bit
+# and 'q' for 64-bit integers
+COLUMNS = dict(account='i', date='i', cents='q', payee='i', memo='i', type='i')
+
+# the columns that reference the string pool
+TEXT = 'account', 'payee', 'memo', 'type'
+
+NUMPY_TYPES = dict(i='<i4', q='<i8')
+
+
+class Pool(list):
+    """
+    A pool of strings, referenced by their indexes.
+
+    >>> pool = Pool(['Coffee'])
+    >>> pool.intern('Employer'), pool.intern('Coffee'), pool
+    (1, 0, ['Coffee', 'Employer'])
+    """
+
+    def __init__(self, strings=()):
+        super().__init__(strings)
+        self.codes = {text: code for code, text in enumerate(self)}
+
+    def intern(self, text):
+        """
+        Return the index of text, adding it if it's not already there.
+        """
+        code = self.codes.get(text)
+        if code is None:
+            code = self.codes[text] = len(self)
+            self.append(text)
+        return code
+
+
+def mask(columns, start=None, end=None, **codes):
+    """
+    Select the rows dated from start through end (inclusive, where
+    supplied) with the codes supplied for text columns.
+    """
+    import numpy
+
+    selected = numpy.ones(len(columns['date']), dtype=bool)
+    for name, code in codes.items():
+        selected &= columns[name] == code
+    if start is not None:
+        selected &= columns['date'] >= start.toordinal()
+    if end is not None:
+        selected &= columns['date'] <= end.toordinal()
+    return selected
+
+
+def sum_by(keys, cents, labels):
+    """
+    Sum the cents by their keys (indexes into labels), for each
+    label with a key.
+    """
+    import numpy
+
+    sums = numpy.zeros(len(labels), dtype='<i8')
+    numpy.add.at(sums, keys, cents)
+    return {labels[key]: int(sums[key]) for key in numpy.unique(keys)}
+
+
+class Store:
+    """
+    The columns of transactions, as (account, date, cents, payee,
+    memo, type), in the order ingested, under root.
+    """
+
+    def __init__(self, root):
+        self.root = path.Path(root)
+        self._strings = None
+        self._fitids = None
+
+    def _column_path(self, name):
+        return self.root / f'{name}.{COLUMNS[name]}'
+
+    @property
+    def _strings_path(self):
+        return self.root / 'strings.jsonl'
+
+    @property
+    def strings(self):
+        """
+        The string pool, loaded on demand.
+        """
+        if self._strings is None:
+            self._strings = Pool()
+            if self._strings_path.exists():
+                with self._strings_path.open(encoding='utf-8') as stream:
+                    self._strings = Pool(map(json.loads, stream))
+        return self._strings
+
+    @property
+    def index(self):
+        """
+        The index of each string in the pool.
+        """
+        return self.strings.codes
+
+    @property
+    def fitids(self):
+        """
+        The index of the transactions ingested, by account and FITID.
+        """
+        if self._fitids is None:
+            self.root.makedirs_p()
+            self._fitids = fitids.Index(self.root / 'fitids.sqlite')
+        return self._fitids
+
+    def __len__(self):
+        """
+        The number of complete rows (a partial append leaves some
+        columns longer than others).
+        """
+        return min(
+            (
+                self._column_path(name).size // array.array(code).itemsize
+                if self._column_path(name).exists()
+                else 0
+            )
+            for name, code in COLUMNS.items()
+        )
+
+    def _truncate(self):
+        rows = len(self)
+        for name, code in COLUMNS.items():
+            column = self._column_path(name)
+            if column.exists():
+                os.truncate(column, rows * array.array(code).itemsize)
+
+    def append(self, rows):
+        """
+        Append rows of (account, date, cents, payee, memo, type).
+        """
+        self.root.makedirs_p()
+        self._truncate()
+        columns = {name: array.array(code) for name, code in COLUMNS.items()}
+        strings = self.strings
+        known = len(strings)
+        for account, date, cents, payee, memo, type in rows:
+            columns['account'].append(strings.intern(account))
+            columns['date'].append(date.toordinal())
+            columns['cents'].append(cents)
+            columns['payee'].append(strings.intern(payee or ''))
+            columns['memo'].append(strings.intern(memo or ''))
+            columns['type'].append(strings.intern(type or ''))
+        # add the strings first, so the columns never reference a
+        # string that isn't there
+        with self._strings_path.open('a', encoding='utf-8') as stream:
+            stream.writelines(json.dumps(text) + '\n' for text in strings[known:])
+        for name, values in columns.items():
+            with self._column_path(name).open('ab') as stream:
+                values.tofile(stream)
+        return len(columns['date'])
+
+    def ingest(self, ofx_file):
+        """
+        Append the bank and credit card transactions in the OFX file
+        not already ingested. Return the number of transactions added.
+        """
+        # deferred, as the ledger is slow to import (through
+        # jaraco.itertools) and ingest is the only use of it
+        from . import ledger
+
+        index = self.fitids
+        transactions = [
+            record
+            for record in ofxstream.read_records(ofx_file)
+            if isinstance(record, ofxstream.Transaction)
+            and (record.account or '', record.fitid) not in index
+        ]
+        rows = (
+            (
+                txn.account or '',
+                txn.posted,
+                ledger._cents(txn.amount),
+                txn.name,
+                txn.memo,
+                txn.type,
+            )
+            for txn in transactions
+        )
+        added = self.append(rows)
+        by_account = collections.defaultdict(list)
+        for txn in transactions:
+            if txn.fitid:
+                by_account[txn.account or ''].append(txn.fitid)
+        for account, ids in by_account.items():
+            index.add(account, ids)
+        return added
+
+    def columns(self):
+        """
+        Return each column as a read-only NumPy array mapping its file.
+        """
+        import numpy
+
+        rows = len(self)
+        return {
+            name: (
+                numpy.memmap(
+                    self._column_path(name),
+                    dtype=NUMPY_TYPES[code],
+                    mode='r',
+                    shape=(rows,),
+                )
+                if rows
+                else numpy.empty(0, dtype=NUMPY_TYPES[code])
+            )
+            for name, code in COLUMNS.items()
+        }
+
+    def mask(self, columns, account=None, start=None, end=None):
+        """
+        Select the rows for the account (if any) dated from start
+        through end (inclusive, where supplied).
+        """
+        codes = {} if account is None else dict(account=self.index.get(account, -1))
+        return mask(columns, start, end, **codes)
+
+    def balance(self, account=None, start=None, end=None):
+        """
+        Sum of the amounts (in cents) for the account (or all accounts)
+        in the date range.
+        """
+        columns = self.columns()
+        selected = self.mask(columns, account, start, end)
+        return int(columns['cents'][selected].sum())
+
+    def totals(self, by='payee', account=None, start=None, end=None):
+        """
+        Sum of the amounts (in cents) for each distinct value of a
+        text column (payee, memo, type or account).
+        """
+        assert by in TEXT
+        columns = self.columns()
+        selected = self.mask(columns, account, start, end)
+        return sum_by(columns[by][selected], columns['cents'][selected], self.strings)
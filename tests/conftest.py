@@ -0,0 +1,99 @@
+"""
+A stand-in OFX server for the download tests.
+"""
+
+import asyncio
+import collections
+import re
+import threading
+
+import pytest
+
+
+def respond(body):
+    """
+    A credit card statement for each account requested, under the
+    transaction id of its request.
+    """
+    statements = b''.join(
+        b'<CCSTMTTRNRS><TRNUID>%s<STATUS><CODE>0<SEVERITY>INFO</STATUS>'
+        b'<CCSTMTRS><CURDEF>USD<CCACCTFROM><ACCTID>%s</CCACCTFROM>'
+        b'<BANKTRANLIST><DTSTART>20261001<DTEND>20261017'
+        b'<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20261002<TRNAMT>-5.00'
+        b'<FITID>%s1<NAME>Coffee</STMTTRN></BANKTRANLIST>'
+        b'<LEDGERBAL><BALAMT>-5.00<DTASOF>20261017</LEDGERBAL>'
+        b'</CCSTMTRS></CCSTMTTRNRS>' % (trnuid, account, account)
+        for trnuid, account in re.findall(
+            rb'<TRNUID>(\w+).*?<ACCTID>(\w+)', body, re.DOTALL
+        )
+    )
+    return (
+        b'OFXHEADER:100\r\nDATA:OFXSGML\r\nVERSION:102\r\n\r\n<OFX>'
+        b'<SIGNONMSGSRSV1><SONRS><STATUS><CODE>0<SEVERITY>INFO</STATUS>'
+        b'<DTSERVER>20261017<LANGUAGE>ENG</SONRS></SIGNONMSGSRSV1>'
+        b'<CREDITCARDMSGSRSV1>' + statements + b'</CREDITCARDMSGSRSV1></OFX>'
+    )
+
+
+@pytest.fixture
+def unavailable():
+    """
+    The accounts for which the server responds 503 Service Unavailable.
+    """
+    return set()
+
+
+@pytest.fixture
+def peaks():
+    """
+    The most requests the server handled at once, by query string.
+    """
+    return collections.Counter()
+
+
+@pytest.fixture
+def server(unavailable, peaks):
+    """
+    Serve statements on localhost from an event loop in another
+    thread, yielding the URL and the bodies of the requests received.
+    """
+    web = pytest.importorskip('aiohttp.web')
+    requests = []
+    active = collections.Counter()
+
+    async def handle(request):
+        body = await request.read()
+        requests.append(body)
+        site = request.query_string
+        active[site] += 1
+        peaks[site] = max(peaks[site], active[site])
+        # linger, so that concurrent requests overlap
+        await asyncio.sleep(0.05)
+        active[site] -= 1
+        accounts = re.findall(rb'<ACCTID>(\w+)', body)
+        if unavailable.intersection(account.decode() for account in accounts):
+            return web.Response(status=503, text='Try again later')
+        return web.Response(body=respond(body), content_type='application/x-ofx')
+
+    app = web.Application()
+    app.router.add_post('/', handle)
+    runner = web.AppRunner(app)
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(runner.setup())
+    loop.run_until_complete(web.TCPSite(runner, '127.0.0.1', 0).start())
+    host, port = runner.addresses[0][:2]
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield f'http://{host}:{port}/', requests
+    asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+
+@pytest.fixture
+def config():
+    """
+    A function making the config of an institution served at url.
+    """
+    return lambda url: dict(caps=['SIGNON', 'CCSTMT'], fiorg='Bank', url=url)
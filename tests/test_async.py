@@ -0,0 +1,64 @@
+"""
+Exercise the asyncio client against a stand-in OFX server.
+"""
+
+import argparse
+import asyncio
+
+import path
+import pytest
+
+from jaraco.financial import ofx, ofxstream
+
+pytest.importorskip('aiohttp')
+
+
+def test_do_query(server, config, tmp_path):
+    import aiohttp
+
+    url, requests = server
+    target = tmp_path / 'statement.ofx'
+
+    async def download():
+        async with aiohttp.ClientSession() as session:
+            client = ofx.AsyncOFXClient(config(url), 'me', 'secret', session)
+            await client.doQuery(client.ccQuery('1234', '20261001'), target)
+
+    asyncio.run(download())
+    assert len(requests) == 1
+    ofxstream.validate_file(target)
+    (record,) = ofxstream.read_records(target)
+    assert (record.account, record.fitid) == ('1234', '12341')
+
+
+def test_download_all_async_batch(server, config, tmp_path, monkeypatch):
+    url, requests = server
+    monkeypatch.setattr(ofx.Base, 'root', path.Path(tmp_path))
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(ofx.sites, '_data', dict(Bank=config(url)))
+    monkeypatch.setattr(ofx.Command, '_get_password', lambda site, username: 'pw')
+    accounts = [ofx.Account('Bank', account, username='me') for account in '123']
+    monkeypatch.setattr(ofx.DownloadAll, 'load_accounts', lambda: accounts)
+    args = argparse.Namespace(
+        accounts=None,
+        start_date=None,
+        overlap=3,
+        jobs=2,
+        per_institution=1,
+        use_async=True,
+        batch=True,
+        validate=True,
+        launch=False,
+        compress=False,
+        retries=0,
+        rate=None,
+        ingest=False,
+        new_only=False,
+    )
+    ofx.DownloadAll.run(args)
+    assert len(requests) == 1
+    for account in '123':
+        (statement,) = tmp_path.glob(f'Bank {account} *.ofx')
+        records = list(ofxstream.read_records(statement))
+        assert [record.account for record in records] == [account]
+    assert ofx.Watermarks.load() == {f'Bank {account}': '20261017' for account in '123'}
@@ -0,0 +1,89 @@
+"""
+Exercise the caching of the institutions loaded from plugins and
+the institutions file.
+"""
+
+import json
+import os
+import types
+
+import path
+import pytest
+
+from jaraco.financial import ofx
+
+pytest.importorskip('yaml')
+
+
+class EntryPoint(types.SimpleNamespace):
+    """
+    A stand-in for a plugin's entry point, counting its loads.
+    """
+
+    loads = 0
+
+    def load(self):
+        type(self).loads += 1
+        if isinstance(self.institutions, Exception):
+            raise self.institutions
+        return self.institutions
+
+
+def entry_point(institutions, name='plugin'):
+    dist = types.SimpleNamespace(name='plugin-dist', version='1.0')
+    return EntryPoint(
+        name=name, value='plugin:sites', dist=dist, institutions=institutions
+    )
+
+
+@pytest.fixture
+def root(tmp_path, monkeypatch):
+    root = path.Path(tmp_path)
+    monkeypatch.setattr(ofx.Base, 'root', root)
+    monkeypatch.setattr(EntryPoint, 'loads', 0)
+    (root / 'institutions.yaml').write_text('Bank:\n  url: https://bank\n')
+    return root
+
+
+def touch(file, content):
+    """
+    Rewrite the file, moving its modification time on.
+    """
+    mtime = file.stat().st_mtime
+    file.write_text(content)
+    os.utime(file, (mtime + 10, mtime + 10))
+
+
+def test_cache_reused_until_file_changes(root, monkeypatch):
+    eps = [entry_point(dict(Card=dict(url='https://card')))]
+    monkeypatch.setattr(ofx, '_entry_points', lambda: eps)
+    assert sorted(ofx.Sites()) == ['Bank', 'Card']
+    assert EntryPoint.loads == 1
+    assert ofx.Sites._cache_path().exists()
+
+    # a fresh instance (as on the next run) reuses the cache
+    assert sorted(ofx.Sites()) == ['Bank', 'Card']
+    assert EntryPoint.loads == 1
+
+    touch(root / 'institutions.yaml', 'Credit Union:\n  url: https://cu\n')
+    assert sorted(ofx.Sites()) == ['Card', 'Credit Union']
+    assert EntryPoint.loads == 2
+
+
+def test_not_cached_when_plugin_fails(root, monkeypatch):
+    eps = [
+        entry_point(dict(Card=dict(url='https://card'))),
+        entry_point(ImportError('broken plugin'), name='broken'),
+    ]
+    monkeypatch.setattr(ofx, '_entry_points', lambda: eps)
+    assert sorted(ofx.Sites()) == ['Bank', 'Card']
+    assert not ofx.Sites._cache_path().exists()
+
+    # the next run tries the plugins again
+    assert sorted(ofx.Sites()) == ['Bank', 'Card']
+    assert EntryPoint.loads == 4
+
+    eps.pop()
+    assert sorted(ofx.Sites()) == ['Bank', 'Card']
+    cached = json.loads(ofx.Sites._cache_path().read_text())
+    assert sorted(cached['sites']) == ['Bank', 'Card']
@@ -0,0 +1,72 @@
+"""
+Exercise the threaded download driver against a stand-in OFX server.
+"""
+
+import argparse
+import logging
+
+import path
+import pytest
+
+from jaraco.financial import ofx, ofxstream
+
+
+def test_download_all_threaded(
+    server, config, unavailable, peaks, tmp_path, monkeypatch, caplog
+):
+    url, requests = server
+    unavailable.add('2')
+    monkeypatch.setattr(ofx.Base, 'root', path.Path(tmp_path))
+    monkeypatch.chdir(tmp_path)
+    sites = dict(Bank=config(f'{url}?bank'), Card=config(f'{url}?card'))
+    monkeypatch.setattr(ofx.sites, '_data', sites)
+    monkeypatch.setattr(ofx.Command, '_get_password', lambda site, username: 'pw')
+    accounts = [
+        ofx.Account(site, account, username='me')
+        for site, account in [
+            ('Bank', '1'),
+            ('Card', '4'),
+            ('Bank', '2'),
+            ('Bank', '3'),
+        ]
+    ]
+    monkeypatch.setattr(ofx.DownloadAll, 'load_accounts', lambda: accounts)
+    args = argparse.Namespace(
+        accounts=None,
+        start_date=None,
+        overlap=3,
+        jobs=3,
+        per_institution=1,
+        use_async=False,
+        batch=False,
+        validate=True,
+        launch=False,
+        compress=False,
+        retries=0,
+        rate=100,
+        ingest=False,
+        new_only=False,
+    )
+    with pytest.raises(SystemExit, match='1 of 4 downloads failed'):
+        ofx.DownloadAll.run(args)
+    assert len(requests) == 4
+    # the three Bank downloads were made one at a time
+    assert peaks['bank'] == 1
+    for site, account in [('Bank', '1'), ('Bank', '3'), ('Card', '4')]:
+        (statement,) = tmp_path.glob(f'{site} {account} *.ofx')
+        records = list(ofxstream.read_records(statement))
+        assert [record.account for record in records] == [account]
+    assert not list(tmp_path.glob('Bank 2 *'))
+    assert ofx.Watermarks.load() == {
+        'Bank 1': '20261017',
+        'Bank 3': '20261017',
+        'Card 4': '20261017',
+    }
+    errors = [
+        record.getMessage()
+        for record in caplog.records
+        if record.levelno == logging.ERROR
+    ]
+    assert errors == [
+        f'Bank 2 failed: 503 Server Error: Service Unavailable for url: {url}?bank'
+    ]